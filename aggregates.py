@@ -0,0 +1,201 @@
+"""Server-side totals over ledger transactions and history lines
+
+Rows are read a fetch batch at a time with only the columns a summary needs,
+transposed straight into NumPy arrays (a ColumnBatch) and reduced with
+vectorized group-by sums - no pydantic models or per-row dicts. Each batch is
+reduced on its own and the partial totals are merged as they accumulate, so
+memory is bounded by the number of groups rather than the rows scanned.
+"""
+from typing import Union, get_args, get_origin
+from tables import LEDGER_TRANSACTIONS, HISTORY_LINES
+
+try:
+    import numpy
+except ImportError:  # Optional - only the /api/summary endpoints need it
+    numpy = None
+
+def _numbers(values):
+    """float64 array; None (and NaN) count as 0 in totals"""
+    try:
+        array = numpy.array(values, dtype=numpy.float64)
+    except (TypeError, ValueError):
+        # Text cells such as NUL or blanks
+        array = numpy.array([_number_or_zero(value) for value in values], dtype=numpy.float64)
+    return numpy.nan_to_num(array, copy=False)
+
+def _number_or_zero(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _integers(values):
+    """int64 array; None and NUL/blank text are 0, as in the row mappers"""
+    try:
+        return numpy.array(values, dtype=numpy.int64)
+    except (TypeError, ValueError):
+        return numpy.array([int(_number_or_zero(value)) for value in values], dtype=numpy.int64)
+
+def _codes(values):
+    """object array of trimmed text; None groups with blank"""
+    return numpy.array([value.strip() if isinstance(value, str) else ("" if value is None else value) for value in values], dtype=object)
+
+_CONVERTERS = {"number": _numbers, "int": _integers, "code": _codes}
+
+class ColumnBatch:
+    """Named NumPy columns of equal length - one fetch batch, or merged partial totals"""
+    
+    def __init__(self, columns):
+        self.columns = columns
+    
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+    
+    def __getitem__(self, name):
+        return self.columns[name]
+    
+    @classmethod
+    def from_rows(cls, rows, layout):
+        """Transpose fetchmany rows into arrays; layout is [(name, kind)] in SELECT order, kind number/int/code"""
+        values = list(zip(*rows)) if rows else [() for _ in layout]
+        return cls({name: _CONVERTERS[kind](list(column)) for (name, kind), column in zip(layout, values)})
+    
+    @classmethod
+    def concat(cls, batches):
+        names = list(batches[0].columns)
+        return cls({name: numpy.concatenate([batch.columns[name] for batch in batches]) for name in names})
+    
+    def filter(self, mask):
+        """Rows where mask is true"""
+        return ColumnBatch({name: values[mask] for name, values in self.columns.items()})
+    
+    def group_sum(self, by, measures):
+        """One row per distinct combination of the by columns, with each measure summed
+        
+        Adds a "count" column of rows per group. If this batch already holds
+        a "count" (merged partial totals) it is summed rather than counted.
+        Groups come out sorted by their by values.
+        """
+        size = len(self)
+        if by:
+            uniques = []
+            positions = []
+            for name in by:
+                unique, inverse = numpy.unique(self.columns[name], return_inverse=True)
+                uniques.append(unique)
+                positions.append(inverse.reshape(-1))
+            shape = tuple(len(unique) for unique in uniques)
+            combined = numpy.ravel_multi_index(positions, shape) if size else numpy.zeros(0, dtype=numpy.intp)
+            groups, group_of_row = numpy.unique(combined, return_inverse=True)
+            group_of_row = group_of_row.reshape(-1)
+            result = {name: unique[part] for name, unique, part in zip(by, uniques, numpy.unravel_index(groups, shape))}
+            group_count = len(groups)
+        else:
+            # Grand total - one group, even over no rows
+            group_of_row = numpy.zeros(size, dtype=numpy.intp)
+            result = {}
+            group_count = 1
+        
+        counts = self.columns.get("count")
+        if counts is None:
+            result["count"] = numpy.bincount(group_of_row, minlength=group_count)
+        else:
+            result["count"] = numpy.bincount(group_of_row, weights=counts, minlength=group_count).astype(numpy.int64)
+        for name in measures:
+            result[name] = numpy.bincount(group_of_row, weights=self.columns[name], minlength=group_count).astype(numpy.float64, copy=False)
+        return ColumnBatch(result)
+    
+    def to_records(self, decimals=6):
+        """List of dicts with plain Python values, floats rounded to hide binary noise"""
+        names = list(self.columns)
+        columns = []
+        for values in self.columns.values():
+            if values.dtype.kind == "f":
+                values = numpy.round(values, decimals)
+            columns.append(values.tolist())
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+def _kind(table, column):
+    annotation = table.model.model_fields[table.attribute(column)].annotation
+    if get_origin(annotation) is Union:
+        annotation = next((arg for arg in get_args(annotation) if arg is not type(None)), None)
+    return "int" if annotation is int else "code"
+
+class Summary:
+    """The totals offered for one table: columns to group by, measures to sum
+    
+    products are derived measures, name -> (column, column), summed as the
+    row-wise product (e.g. quantity x unit price).
+    """
+    
+    def __init__(self, table, groups, measures, products=None):
+        self.table = table
+        self.groups = {table.attribute(column): (column, _kind(table, column)) for column in groups}
+        self.measures = {table.attribute(column): column for column in measures}
+        self.products = dict(products or {})
+    
+    def parse_group_by(self, group_by):
+        """Attribute names from a comma-separated group_by value; ValueError names anything unknown"""
+        names = [name.strip() for name in (group_by or "").split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.groups]
+        if unknown:
+            raise ValueError(f"Cannot group {self.table.name} by {', '.join(unknown)} (available: {', '.join(self.groups)})")
+        return list(dict.fromkeys(names))
+    
+    def measure_names(self):
+        return list(self.measures) + list(self.products)
+    
+    def layout(self, by):
+        """(columns to SELECT, ColumnBatch layout) for a grouping"""
+        layout = [(name, self.groups[name][1]) for name in by]
+        columns = [self.groups[name][0] for name in by]
+        product_columns = [column for pair in self.products.values() for column in pair]
+        for column in list(self.measures.values()) + product_columns:
+            if column not in columns:
+                columns.append(column)
+                layout.append((column, "number"))
+        return columns, layout
+    
+    def batch(self, rows, layout):
+        """ColumnBatch of one fetch batch with the measures (and products) under their output names"""
+        raw = ColumnBatch.from_rows(rows, layout)
+        columns = {name: raw[name] for name, kind in layout if kind != "number"}
+        for name, column in self.measures.items():
+            columns[name] = raw[column]
+        for name, (left, right) in self.products.items():
+            columns[name] = raw[left] * raw[right]
+        return ColumnBatch(columns)
+    
+    def totals(self, batches, by, merge_rows=50000):
+        """Group sums over an iterable of fetch batches (raw rows); returns (ColumnBatch, rows read)"""
+        columns, layout = self.layout(by)
+        measures = self.measure_names()
+        partials = []
+        pending = 0
+        rows_read = 0
+        for rows in batches:
+            rows_read += len(rows)
+            partial = self.batch(rows, layout).group_sum(by, measures)
+            partials.append(partial)
+            pending += len(partial)
+            # Fold partial totals together before they outgrow one batch's worth of groups
+            if pending >= merge_rows:
+                partials = [ColumnBatch.concat(partials).group_sum(by, measures)]
+                pending = len(partials[0])
+        if not partials:
+            return self.batch([], layout).group_sum(by, measures), 0
+        return ColumnBatch.concat(partials).group_sum(by, measures), rows_read
+
+SUMMARIES = {
+    LEDGER_TRANSACTIONS.name: Summary(
+        LEDGER_TRANSACTIONS,
+        groups=["GDC", "AccNumber", "LinkAcc", "JobCode", "PPeriod", "EType", "TaxType"],
+        measures=["Amount", "TaxAmt", "CurrAmt"]
+    ),
+    HISTORY_LINES.name: Summary(
+        HISTORY_LINES,
+        groups=["ItemCode", "CustomerCode", "SalesmanCode", "DocumentType", "PPeriod", "CostCode", "MultiStore"],
+        measures=["Qty", "TaxAmt", "DiscountAmount"],
+        products={"value": ("Qty", "UnitPrice"), "cost": ("Qty", "CostPrice")}
+    ),
+}
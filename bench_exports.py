@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Compare NDJSON, Arrow IPC and Parquet exports of HistoryLines and LedgerTransactions
+
+Runs without a database - builds synthetic rows spread over a range of
+periods, with code columns drawn from realistic pools (a few hundred
+customers, a couple of thousand items, a handful of salesmen), and pushes
+them through the same encoders the /api/export endpoints use. Reports size,
+encode time and the time to load each file back.
+
+    python bench_exports.py [rows] [periods]
+"""
+import io
+import json
+import sys
+import time
+
+import pyarrow.ipc
+import pyarrow.parquet
+
+from bench_row_mapping import synthetic_rows
+from columnar import encode_arrow_stream, encode_parquet
+from streaming import encode_ndjson
+from tables import HISTORY_LINES, LEDGER_TRANSACTIONS
+
+def batches_of(items, size=200):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def encode(encoder, table, items):
+    start = time.perf_counter()
+    data = b"".join(chunk for chunk, _ in encoder(table, batches_of(items)))
+    return data, time.perf_counter() - start
+
+def load_ndjson(data):
+    return [json.loads(line) for line in data.splitlines()]
+
+def load_arrow(data):
+    return pyarrow.ipc.open_stream(data).read_all()
+
+def load_parquet(data):
+    return pyarrow.parquet.read_table(io.BytesIO(data))
+
+def timed(load, data, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    periods = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+
+    for table in (HISTORY_LINES, LEDGER_TRANSACTIONS):
+        items = [table.mapper(row) for row in synthetic_rows(table, count, periods)]
+        print(f"{table.source}: {count} rows over {periods} periods")
+
+        baseline = None
+        for label, encoder, load in [
+            ("NDJSON", encode_ndjson, load_ndjson),
+            ("Arrow IPC stream", encode_arrow_stream, load_arrow),
+            ("Parquet", encode_parquet, load_parquet),
+        ]:
+            data, encode_time = encode(encoder, table, items)
+            load_time = timed(load, data)
+            if baseline is None:
+                baseline = (len(data), load_time)
+            print(f"  {label:18} {len(data) / 1e6:8.2f} MB ({len(data) / baseline[0]:5.1%})"
+                  f"  encode {encode_time * 1000:7.1f} ms"
+                  f"  load {load_time * 1000:7.1f} ms ({baseline[1] / load_time:5.1f}x faster)")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measure what interning code columns saves on large pages and exports
+
+Runs without a database - builds Pastel-shaped HistoryLines and
+LedgerTransactions rows (codes drawn from realistic pools, padded like
+Pastel's fixed-width text) and maps them with and without the mapper's
+code-column interning. Reports the memory held by a full page of models,
+by one export fetch batch, and the Arrow export encode time (dictionary
+encoding hashes each code, and a shared string hashes only once).
+
+    python bench_interning.py [rows]
+"""
+import sys
+import time
+import tracemalloc
+
+from bench_row_mapping import synthetic_rows
+from config import settings
+from mappers import RowMapper, code_strings
+from tables import HISTORY_LINES, LEDGER_TRANSACTIONS
+
+def mappers_for(table):
+    plain = RowMapper(table.model, table.columns, table._converters, table._default)
+    return [("plain", plain), ("interned", table.mapper)]
+
+def held_memory(mapper, rows):
+    """Bytes still allocated by the mapped models (and any new interned strings)"""
+    code_strings.strings.clear()
+    tracemalloc.start()
+    items = [mapper(row) for row in rows]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return held
+
+def arrow_encode_time(table, mapper, rows, repeat=3):
+    import columnar
+    if columnar.pyarrow is None:
+        return None
+    items = [mapper(row) for row in rows]
+    batches = [items[start:start + settings.fetch_batch_size] for start in range(0, len(items), settings.fetch_batch_size)]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in columnar.encode_arrow_stream(table, iter(batches)):
+            pass
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4500
+
+    for table in (HISTORY_LINES, LEDGER_TRANSACTIONS):
+        # Fresh string objects per row, as pyodbc returns them
+        rows = synthetic_rows(table, count, 12)
+        batch = rows[:settings.fetch_batch_size]
+        export_rows = synthetic_rows(table, 50000, 12)
+        print(f"{table.source}: codes {', '.join(table.codes)}")
+        baseline = None
+        for label, mapper in mappers_for(table):
+            page = held_memory(mapper, rows)
+            one_batch = held_memory(mapper, batch)
+            encode = arrow_encode_time(table, mapper, export_rows)
+            if baseline is None:
+                baseline = (page, one_batch)
+            line = (f"  {label:9} {count}-row page {page / 1e6:6.2f} MB ({page / baseline[0]:4.0%})"
+                    f"  export batch of {len(batch)} {one_batch / 1e3:7.1f} kB ({one_batch / baseline[1]:4.0%})")
+            if encode is not None:
+                line += f"  Arrow encode of 50000 rows {encode * 1000:6.0f} ms"
+            print(line)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare the object-per-row page format with the compact and sparse formats
+
+Runs without a database - builds a full page of synthetic rows for every
+table (with a share of blank, i.e. null, values) and renders it through the
+same response classes the list endpoints use. Reports body size, gzip size
+and render time per format.
+
+    python bench_page_formats.py [rows] [null_share]
+"""
+from datetime import datetime
+import gzip
+import random
+import sys
+import time
+
+import models
+from bench_row_mapping import sample_value
+from models import PaginationMetadata
+from responses import CompactPageResponse, FastResponse
+from tables import TABLES
+
+def synthetic_page(table, count, null_share):
+    rng = random.Random(7)
+    required = {name for name, field in table.model.model_fields.items() if field.is_required()}
+    items = []
+    for index in range(count):
+        row = tuple(
+            None if name not in required and rng.random() < null_share else sample_value(table.model, name, index)
+            for name in table.mapper.names
+        )
+        items.append(table.mapper(row))
+    metadata = PaginationMetadata(page_size=count, has_more=True, next_cursor="MTIzNA==", timestamp=datetime.now())
+    return getattr(models, f"{table.model.__name__}Response")(data=items, metadata=metadata)
+
+def render(make, page, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = make(page).body
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return body, best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4500
+    null_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    print(f"{count}-row pages, {null_share:.0%} of optional values null")
+    for table in TABLES.values():
+        page = synthetic_page(table, count, null_share)
+        print(f"{table.source} ({len(table.model.model_fields)} fields)")
+        baseline = None
+        for label, make in [
+            ("objects", FastResponse),
+            ("compact", CompactPageResponse),
+            ("sparse", lambda page: CompactPageResponse(page, sparse=True)),
+        ]:
+            body, elapsed = render(make, page)
+            zipped = len(gzip.compress(body, 6))
+            if baseline is None:
+                baseline = (len(body), zipped, elapsed)
+            print(f"  {label:8} {len(body) / 1e6:7.2f} MB ({len(body) / baseline[0]:4.0%})"
+                  f"  gzip {zipped / 1e3:8.1f} kB ({zipped / baseline[1]:4.0%})"
+                  f"  render {elapsed * 1000:7.1f} ms ({elapsed / baseline[2]:4.0%})")
+        print()
+
+if __name__ == "__main__":
+    main()
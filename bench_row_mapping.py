@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Benchmark per-row mapping cost: inline regex snake_casing vs. precompiled RowMapper
+
+Runs without a database - builds synthetic CustomerMaster, HistoryLine and
+LedgerTransaction rows shaped like Pastel's and maps a full 4500-row page
+both ways.
+
+    python bench_row_mapping.py [rows]
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import random
+import re
+import sys
+import time
+
+from tables import CUSTOMERS, CUSTOMER_FIELDS, HISTORY_LINES, HISTORY_LINE_FIELDS, LEDGER_TRANSACTIONS, LEDGER_TRANSACTION_FIELDS
+from models import CustomerMaster, HistoryLine, LedgerTransaction
+
+def legacy_customer_row(row):
+    """The mapping loop the customer handlers ran before RowMapper"""
+    customer_data = {}
+    for j, field in enumerate(CUSTOMER_FIELDS):
+        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', field)
+        s2 = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1)
+        s3 = re.sub('([a-zA-Z])(\d)', r'\1_\2', s2)
+        snake_case_field = s3.lower()
+        value = row[j]
+
+        if field == 'UpdatedOn' and value:
+            # UpdatedOn is a timestamp (DD/MM/YYYY HH:MM:SS), parsed as the inventory handlers did
+            if isinstance(value, str):
+                try:
+                    if '/' in value:
+                        customer_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y %H:%M:%S')
+                    else:
+                        customer_data[snake_case_field] = datetime.fromisoformat(value)
+                except:
+                    customer_data[snake_case_field] = None
+            else:
+                customer_data[snake_case_field] = value
+        elif field in ['LastCrDate', 'CreateDate'] and value:
+            if isinstance(value, str):
+                try:
+                    if '/' in value:
+                        customer_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y').date()
+                    else:
+                        customer_data[snake_case_field] = datetime.fromisoformat(value).date()
+                except:
+                    customer_data[snake_case_field] = None
+            else:
+                customer_data[snake_case_field] = value
+        else:
+            customer_data[snake_case_field] = value
+    return customer_data
+
+def legacy_history_line_row(row):
+    """The mapping loop the history line handlers ran before RowMapper"""
+    line_data = {}
+    for j, field in enumerate(HISTORY_LINE_FIELDS):
+        s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', field)
+        s2 = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', s1)
+        s3 = re.sub(r'([a-zA-Z])(\d)', r'\1_\2', s2)
+        snake_case_field = s3.lower()
+        value = row[j]
+
+        if field == 'DDate' and value:
+            if isinstance(value, str):
+                try:
+                    if '/' in value:
+                        line_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y').date()
+                    else:
+                        line_data[snake_case_field] = datetime.fromisoformat(value).date()
+                except:
+                    line_data[snake_case_field] = None
+            else:
+                line_data[snake_case_field] = value
+        elif field == 'DateTime' and value:
+            if isinstance(value, str):
+                try:
+                    line_data[snake_case_field] = datetime.fromisoformat(value)
+                except:
+                    line_data[snake_case_field] = None
+            else:
+                line_data[snake_case_field] = value
+        elif isinstance(value, str):
+            line_data[snake_case_field] = value.strip()
+        else:
+            line_data[snake_case_field] = value
+    return line_data
+
+def legacy_ledger_transaction_row(row):
+    """The mapping loop the ledger handlers ran before RowMapper"""
+    transaction_data = {}
+    for j, field in enumerate(LEDGER_TRANSACTION_FIELDS):
+        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', field)
+        s2 = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1)
+        s3 = re.sub('([a-zA-Z])(\d)', r'\1_\2', s2)
+        snake_case_field = s3.lower()
+        value = row[j]
+
+        if field in ['DDate', 'TaxReportDate'] and value:
+            if isinstance(value, str):
+                try:
+                    if '/' in value:
+                        transaction_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y').date()
+                    else:
+                        transaction_data[snake_case_field] = datetime.fromisoformat(value).date()
+                except:
+                    transaction_data[snake_case_field] = None
+            else:
+                transaction_data[snake_case_field] = value
+        elif isinstance(value, str):
+            # Rebuilt for every cell, as it was
+            integer_fields = [
+                'CurrCode', 'PPeriod', 'EType', 'ReconFlag', 'TaxType',
+                'UserID', 'UpdateReconFlag', 'ChequeFlag', 'LinkID',
+                'InInv', 'TaxReportPeriod', 'BatchID', 'TransactionID',
+                'Exported', 'ExportNum'
+            ]
+            if field in integer_fields and value in ['\x00', '', ' ', None]:
+                transaction_data[snake_case_field] = 0
+            else:
+                transaction_data[snake_case_field] = value.strip()
+        else:
+            transaction_data[snake_case_field] = value
+    return transaction_data
+
+def sample_value(model, name, index):
+    """A value of the right type for the model attribute, padded like Pastel text"""
+    # Columns the model doesn't declare are ignored by pydantic - text is fine
+    field = model.model_fields.get(name)
+    annotation = str(field.annotation) if field else ''
+    if 'datetime' in annotation:
+        return '2025-05-14 12:26:28'
+    if 'date' in annotation:
+        return '14/05/2025'
+    if 'Decimal' in annotation:
+        return Decimal('1234.56')
+    if 'float' in annotation:
+        return 1234.56
+    if 'bool' in annotation:
+        return index % 2 == 0
+    if 'int' in annotation:
+        return index % 7
+    return f"VAL{index:04d}      "
+
+def synthetic_rows(table, count, periods):
+    """Pastel-shaped raw rows: padded text, DD/MM/YYYY dates, Decimal amounts"""
+    rng = random.Random(42)
+    pools = {
+        "CustomerCode": [f"CUS{i:04d}" for i in range(300)],
+        "ItemCode": [f"ITM{i:05d}" for i in range(2000)],
+        "SalesmanCode": [f"S{i:02d}" for i in range(8)],
+        "AccNumber": [f"{i:04d}000" for i in range(120)],
+        "LinkAcc": [f"{i:04d}000" for i in range(120)],
+        "GDC": ["G", "D", "C"],
+        "UnitUsed": ["EACH", "BOX", "KG"],
+    }
+    start = date(2025, 3, 1)
+    names = table.mapper.names
+    rows = []
+    for index in range(count):
+        period = index * periods // count + 1
+        day = start + timedelta(days=(period - 1) * 30 + rng.randrange(30))
+        row = []
+        for column, name in zip(table.columns, names):
+            if column in pools:
+                value = rng.choice(pools[column]) + "   "
+            elif column in ("DocumentNumber", "Refrence"):
+                value = f"INV{index // 4:06d}  "
+            elif column in ("AutoNumber", "LinkNum"):
+                value = index
+            elif column == "PPeriod":
+                value = period
+            elif column == "DDate":
+                value = day.strftime("%d/%m/%Y")
+            elif column == "DateTime":
+                value = datetime.combine(day, datetime.min.time()).isoformat(" ")
+            elif column in ("Amount", "TaxAmt", "Qty", "UnitPrice", "CostPrice", "CurrAmt"):
+                value = Decimal(rng.randrange(-500000, 500000)) / 100
+            else:
+                value = sample_value(table.model, name, index % 5)
+            row.append(value)
+        rows.append(tuple(row))
+    return rows
+
+def build_rows(model, mapper, count):
+    template = tuple(sample_value(model, name, i) for i, name in enumerate(mapper.names))
+    return [template] * count
+
+def bench(label, func, rows):
+    start = time.perf_counter()
+    for row in rows:
+        func(row)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:32} {elapsed * 1000:9.1f} ms total  {elapsed / len(rows) * 1e6:8.2f} us/row")
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4500
+    cases = [
+        ("CustomerMaster", CustomerMaster, CUSTOMERS.mapper, legacy_customer_row),
+        ("HistoryLines", HistoryLine, HISTORY_LINES.mapper, legacy_history_line_row),
+        ("LedgerTransactions", LedgerTransaction, LEDGER_TRANSACTIONS.mapper, legacy_ledger_transaction_row),
+    ]
+
+    for table, model, mapper, legacy in cases:
+        rows = build_rows(model, mapper, count)
+        assert legacy(rows[0]) == mapper.to_dict(rows[0]), f"{table}: mappers disagree"
+
+        print(f"{table}: {count} rows x {len(mapper.columns)} columns")
+        before = bench("inline regex (dict only)", legacy, rows)
+        after = bench("RowMapper.to_dict", mapper.to_dict, rows)
+        print(f"  speed-up: {before / after:.1f}x")
+        bench("inline regex + model", lambda row: model(**legacy(row)), rows)
+        bench("RowMapper + model", mapper, rows)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compare totalling ledger transactions through models with the NumPy summary engine
+
+Runs without a database - builds Pastel-shaped LedgerTransactions and
+HistoryLines rows and totals them grouped by account/period and item:
+once the way a client does it from list pages (map every row to a model,
+then add up attributes in a dict), once with aggregates.Summary over
+fetch batches of only the needed columns.
+
+    python bench_summaries.py [rows]
+"""
+from collections import defaultdict
+import sys
+import time
+
+from aggregates import SUMMARIES
+from bench_row_mapping import synthetic_rows
+from config import settings
+from tables import HISTORY_LINES, LEDGER_TRANSACTIONS
+
+def through_models(table, rows, by, measures, products):
+    totals = defaultdict(lambda: [0] + [0.0] * (len(measures) + len(products)))
+    for item in map(table.mapper, rows):
+        entry = totals[tuple(getattr(item, name) for name in by)]
+        entry[0] += 1
+        for index, name in enumerate(measures, 1):
+            entry[index] += getattr(item, name) or 0.0
+        for index, (left, right) in enumerate(products.values(), 1 + len(measures)):
+            entry[index] += (getattr(item, table.attribute(left)) or 0.0) * (getattr(item, table.attribute(right)) or 0.0)
+    return totals
+
+def through_summary(summary, rows, by):
+    columns, _ = summary.layout(by)
+    positions = [summary.table.columns.index(column) for column in columns]
+    # What SELECT of just those columns returns
+    selected = [tuple(row[index] for index in positions) for row in rows]
+    size = settings.summary_fetch_batch_size
+    start = time.perf_counter()
+    totals, _ = summary.totals((selected[offset:offset + size] for offset in range(0, len(selected), size)), by)
+    return totals, time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    for table, by in [(LEDGER_TRANSACTIONS, ["acc_number", "p_period"]), (HISTORY_LINES, ["item_code"])]:
+        summary = SUMMARIES[table.name]
+        rows = synthetic_rows(table, count, 12)
+
+        start = time.perf_counter()
+        expected = through_models(table, rows, by, list(summary.measures), summary.products)
+        model_time = time.perf_counter() - start
+
+        totals, numpy_time = through_summary(summary, rows, by)
+        records = totals.to_records()
+        assert len(records) == len(expected)
+        for record in records:
+            entry = expected[tuple(record[name] for name in by)]
+            assert record["count"] == entry[0]
+            assert all(abs(record[name] - value) < 1e-6 * max(1.0, abs(value)) for name, value in zip(summary.measure_names(), entry[1:]))
+
+        print(f"{table.source}: {count} rows grouped by {', '.join(by)} -> {len(records)} groups")
+        print(f"  models + dict totals {model_time * 1000:8.1f} ms")
+        print(f"  NumPy column batches {numpy_time * 1000:8.1f} ms  ({model_time / numpy_time:.0f}x faster)")
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Arrow IPC and Parquet encoding for table exports
+
+Rows arrive as fetch batches of models (the same values the JSON endpoints
+return) and are transposed into one Arrow record batch per fetch batch, so
+nothing is held beyond the current batch - or the current row group for
+Parquet. Columns are the model fields in JSON key order.
+"""
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Union, get_args, get_origin
+from config import settings
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional - only the .arrows/.parquet exports need it
+    pyarrow = None
+
+def _arrow_type(annotation):
+    if get_origin(annotation) is Union:
+        annotation = next((arg for arg in get_args(annotation) if arg is not type(None)), None)
+    if annotation is bool:
+        return pyarrow.bool_()
+    if annotation is int:
+        return pyarrow.int64()
+    if annotation is float:
+        return pyarrow.float64()
+    if annotation is datetime:
+        return pyarrow.timestamp("us")
+    if annotation is date:
+        return pyarrow.date32()
+    return pyarrow.string()
+
+class ColumnEncoder:
+    """Builds Arrow record batches for one table from batches of its models"""
+    
+    def __init__(self, table):
+        fields = table.model.model_fields
+        self.names = list(fields)
+        self._row = attrgetter(*self.names)
+        
+        # Code columns are dictionary-encoded batch by batch. A dictionary shared
+        # across batches would have to be rebuilt (and compared by the IPC writer)
+        # in full every batch, which is quadratic in the distinct codes and never
+        # frees memory; per batch it is bounded by the fetch batch size
+        coded = {table.attribute(column) for column in table.codes}
+        self._dictionaries = set()
+        arrow_fields = []
+        for name, field in fields.items():
+            arrow_type = _arrow_type(field.annotation)
+            if name in coded and arrow_type == pyarrow.string():
+                self._dictionaries.add(name)
+                arrow_type = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+            arrow_fields.append(pyarrow.field(name, arrow_type, nullable=not field.is_required()))
+        self.schema = pyarrow.schema(arrow_fields)
+    
+    def record_batch(self, items):
+        columns = zip(*map(self._row, items)) if items else [[] for _ in self.names]
+        arrays = []
+        for field, values in zip(self.schema, columns):
+            if field.name in self._dictionaries:
+                arrays.append(pyarrow.array(values, pyarrow.string()).dictionary_encode())
+            else:
+                arrays.append(pyarrow.array(values, field.type))
+        return pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+class _Chunks:
+    """Write-only file object that hands written bytes back to a generator"""
+    
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+    
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+def encode_arrow_stream(table, batches):
+    """Arrow IPC stream format: yields (bytes, rows), one record batch per fetch batch
+    
+    Each batch is preceded by replacement dictionaries for its code columns.
+    """
+    encoder = ColumnEncoder(table)
+    sink = _Chunks()
+    with pyarrow.ipc.new_stream(sink, encoder.schema) as writer:
+        for items in batches:
+            writer.write_batch(encoder.record_batch(items))
+            yield sink.take(), len(items)
+    yield sink.take(), 0
+
+def _row_group(batches):
+    """One row group's batches as a table, with one dictionary per code column"""
+    return pyarrow.Table.from_batches(batches).unify_dictionaries()
+
+def encode_parquet(table, batches):
+    """Parquet file: yields (bytes, rows) as each row group is written
+    
+    Row groups are export_parquet_row_group_rows long and carry min/max
+    statistics, so readers can skip groups outside a date or period range.
+    """
+    encoder = ColumnEncoder(table)
+    sink = _Chunks()
+    writer = pyarrow.parquet.ParquetWriter(
+        sink, encoder.schema,
+        compression=settings.export_parquet_compression,
+        use_dictionary=True,
+        write_statistics=True
+    )
+    pending = []
+    pending_rows = 0
+    try:
+        for items in batches:
+            pending.append(encoder.record_batch(items))
+            pending_rows += len(items)
+            if pending_rows >= settings.export_parquet_row_group_rows:
+                writer.write_table(_row_group(pending), row_group_size=pending_rows)
+                yield sink.take(), pending_rows
+                pending = []
+                pending_rows = 0
+        if pending_rows:
+            writer.write_table(_row_group(pending), row_group_size=pending_rows)
+    finally:
+        writer.close()
+    yield sink.take(), pending_rows
@@ -0,0 +1,251 @@
+"""Response compression negotiated from Accept-Encoding (zstd, br, gzip)
+
+A plain ASGI middleware rather than @app.middleware("http") so streamed
+exports are compressed chunk by chunk as they are sent, instead of being
+buffered. Each chunk is flushed so the client can decode rows as they arrive.
+"""
+from config import settings
+from threading import Lock
+import asyncio
+import logging
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional - br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional - zstd is simply not offered
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Already-compressed formats (Parquet) are left alone
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/vnd.apache.arrow.stream", "text/")
+
+# Bodies this large are compressed off the event loop
+OFFLOAD_BYTES = 256 * 1024
+
+class GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self, data=b""):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+class BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+    
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+    
+    def finish(self, data=b""):
+        return self._compressor.process(data) + self._compressor.finish()
+
+class ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+    
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    
+    def finish(self, data=b""):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+AVAILABLE = {"gzip": GzipEncoder}
+if brotli is not None:
+    AVAILABLE["br"] = BrotliEncoder
+if zstandard is not None:
+    AVAILABLE["zstd"] = ZstdEncoder
+
+# Offered in the configured order of preference when the client accepts several equally
+ENCODERS = {
+    name: AVAILABLE[name]
+    for name in (part.strip() for part in settings.compression_encodings.split(","))
+    if name in AVAILABLE
+}
+
+def negotiate(accept_encoding):
+    """Best encoding we support from an Accept-Encoding header, or None"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+    best = None
+    for encoding in ENCODERS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+class CompressionStats:
+    """Per-endpoint bytes before/after and CPU time spent compressing"""
+    
+    def __init__(self):
+        self._lock = Lock()
+        self._endpoints = {}
+    
+    def _entry(self, endpoint):
+        return self._endpoints.setdefault(endpoint, {
+            "compressed": 0, "skipped_small": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "encodings": {}
+        })
+    
+    def record(self, endpoint, encoding, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["compressed"] += 1
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["cpu_seconds"] += cpu_seconds
+            entry["encodings"][encoding] = entry["encodings"].get(encoding, 0) + 1
+    
+    def record_skip(self, endpoint):
+        with self._lock:
+            self._entry(endpoint)["skipped_small"] += 1
+    
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for endpoint, entry in self._endpoints.items():
+                endpoints[endpoint] = {
+                    "compressed": entry["compressed"],
+                    "skipped_small": entry["skipped_small"],
+                    "bytes_in": entry["bytes_in"],
+                    "bytes_out": entry["bytes_out"],
+                    "ratio": round(entry["bytes_in"] / entry["bytes_out"], 2) if entry["bytes_out"] else None,
+                    "cpu_ms": round(entry["cpu_seconds"] * 1000, 2),
+                    "cpu_ms_per_mb": round(entry["cpu_seconds"] * 1000 / (entry["bytes_in"] / 1e6), 2) if entry["bytes_in"] else None,
+                    "encodings": dict(entry["encodings"])
+                }
+            return {
+                "enabled": settings.compression_enabled,
+                "available": list(ENCODERS),
+                "min_size": settings.compression_min_size,
+                "levels": {
+                    "gzip": settings.compression_gzip_level,
+                    "br": settings.compression_brotli_quality,
+                    "zstd": settings.compression_zstd_level
+                },
+                "endpoints": endpoints
+            }
+
+compression_stats = CompressionStats()
+
+async def _compress(func, data):
+    """func(data) and the CPU time it took - large bodies run off the event loop"""
+    def timed():
+        start = time.thread_time()
+        result = func(data)
+        return result, time.thread_time() - start
+    if len(data) >= OFFLOAD_BYTES:
+        return await asyncio.to_thread(timed)
+    return timed()
+
+class CompressionMiddleware:
+    """Compresses response bodies of at least compression_min_size bytes
+    
+    Bodies are buffered only until that threshold is reached, so a streamed
+    export starts compressing with its first batch. Responses passed through
+    @app.middleware("http") arrive as a stream too, which is why the size
+    can't be taken from the first body message alone.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        response_start = None
+        pending = []
+        pending_size = 0
+        passthrough = False
+        encoder = None
+        bytes_in = 0
+        bytes_out = 0
+        cpu_seconds = 0.0
+        
+        def endpoint_name():
+            # The router records the matched endpoint in the shared scope
+            endpoint = scope.get("endpoint")
+            return getattr(endpoint, "__name__", "other")
+        
+        async def send_compressed(message):
+            nonlocal response_start, pending, pending_size, passthrough, encoder, bytes_in, bytes_out, cpu_seconds
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            
+            if message["type"] == "http.response.start":
+                response_headers = [(name.lower(), value) for name, value in message["headers"]]
+                content_type = next((value for name, value in response_headers if name == b"content-type"), b"").decode("latin-1")
+                if not content_type.startswith(COMPRESSIBLE_TYPES) or any(name == b"content-encoding" for name, _ in response_headers):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Held back until enough of the body is seen to decide
+                response_start = {**message, "headers": response_headers}
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            
+            if encoder is None:
+                pending.append(body)
+                pending_size += len(body)
+                if more_body and pending_size < settings.compression_min_size:
+                    return
+                body = b"".join(pending)
+                pending = []
+                if pending_size < settings.compression_min_size:
+                    compression_stats.record_skip(endpoint_name())
+                    passthrough = True
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                    return
+                
+                encoder = ENCODERS[encoding]()
+                response_headers = [(name, value) for name, value in response_start["headers"] if name != b"content-length"]
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+                response_headers.append((b"vary", b"accept-encoding"))
+                if not more_body:
+                    compressed, cpu = await _compress(encoder.finish, body)
+                    response_headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    compression_stats.record(endpoint_name(), encoding, len(body), len(compressed), cpu)
+                    await send({**response_start, "headers": response_headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send({**response_start, "headers": response_headers})
+            
+            # Streamed body: compress and flush each chunk so the client can decode rows as they arrive
+            compressed, cpu = await _compress(encoder.chunk if more_body else encoder.finish, body)
+            bytes_in += len(body)
+            bytes_out += len(compressed)
+            cpu_seconds += cpu
+            if not more_body:
+                compression_stats.record(endpoint_name(), encoding, bytes_in, bytes_out, cpu_seconds)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+        
+        await self.app(scope, receive, send_compressed)
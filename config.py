@@ -22,9 +22,26 @@ class Settings(BaseSettings):
     allowed_ips: str = ""
     
     # Connection Pool - Following load reduction guidelines
-    max_connections: int = 1  # Reduced from 3 to 1 per guidelines
+    max_connections: int = 1  # Reduced from 3 to 1 per guidelines - ceiling for the adaptive limit
     connection_timeout: int = 5  # Reduced from 30 to 5 seconds
-    connection_acquire_timeout: float = 0.1  # 100ms to fail fast
+    connection_acquire_timeout: float = 0.1  # 100ms to fail fast (low priority / historical requests)
+    admission_timeout_medium: float = 0.5  # Recent-data requests may wait this long for a slot
+    admission_timeout_high: float = 1.0  # Health checks may wait this long for a slot
+    priority_recent_days: int = 45  # Date ranges starting within this many days are medium priority
+    adaptive_concurrency_enabled: bool = True  # Adjust in-flight query limit (1..max_connections) from latency
+    adaptive_latency_target_ms: int = 500  # Back off when smoothed execute latency exceeds this
+    adaptive_latency_smoothing: float = 0.2  # EWMA weight of the newest latency sample
+    adaptive_decrease_factor: float = 0.7  # Multiplicative cut applied when Pastel is slow
+    pool_max_idle_seconds: int = 300  # Close pooled connections idle longer than this
+    pool_max_lifetime_seconds: int = 3600  # Recycle pooled connections after this age
+    pool_validation_interval_seconds: float = 5.0  # Validate before reuse if idle longer than this
+    pool_warmup_connections: int = 1  # Connections opened and validated at startup (and kept alive while idle)
+    pool_keepalive_interval_seconds: int = 60  # Ping idle warm connections this often (0 = off)
+    db_executor_max_queue: int = 10  # Queries allowed to wait in the admission queue before returning busy
+    statement_cache_size: int = 256  # Distinct SQL texts (table + active filters) kept built
+    statement_cache_per_connection: int = 32  # Prepared cursors kept open on each pooled connection
+    intern_table_size: int = 50000  # Distinct code-column strings (customer, item, account codes) shared across rows (0 = no interning)
+    date_cache_size: int = 4096  # Distinct date/timestamp strings kept parsed per format (pages repeat a few dates thousands of times)
     
     # Rate Limiting - Following load reduction guidelines  
     rate_limit_per_minute: int = 30  # Increased from 15 to 30 (above recommended 10-20 range)
@@ -33,12 +50,41 @@ class Settings(BaseSettings):
     # Pagination - Following load reduction guidelines
     max_page_size: int = 4500  # Temporarily increased for initial data load - reduce to 100-500 after
     default_page_size: int = 50  # Default page size
+    fetch_batch_size: int = 200  # Rows per fetchmany call (cursor arraysize)
+    json_renderer: str = "fast"  # fast (pydantic serializer + orjson, NaN -> null) or compatible (byte-identical to FastAPI's json output)
+    export_deadline_seconds: int = 1800  # Cancel an export still streaming after this long (exports hold a connection throughout)
+    export_queue_batches: int = 4  # Encoded fetch batches buffered ahead of a slow export client
+    export_stall_timeout_seconds: int = 30  # Release an export's connection when the client reads nothing for this long
+    export_rows_per_minute: int = 600000  # Per-client row budget for exports - throttled, not rejected (0 = unlimited)
+    export_parquet_row_group_rows: int = 20000  # Rows per Parquet row group (held in memory until written)
+    export_parquet_compression: str = "snappy"  # Parquet codec: snappy, zstd, gzip or none
+    export_csv_delimiter: str = ","  # Default CSV delimiter (overridable per request with ?delimiter=)
+    export_csv_date_format: str = "%d/%m/%Y"  # strftime format for CSV dates - Pastel's own by default
+    summary_fetch_batch_size: int = 5000  # Rows per fetchmany for /api/summary (each batch becomes one set of NumPy arrays)
+    summary_deadline_seconds: int = 300  # Cancel a summary still scanning after this long (summaries read every matching row)
+    
+    # Response compression (negotiated from Accept-Encoding)
+    compression_enabled: bool = True
+    compression_encodings: str = "zstd,br,gzip"  # Preference order; br/zstd need the brotli/zstandard packages
+    compression_min_size: int = 1024  # Bytes - smaller bodies are sent as-is (streams are always compressed)
+    compression_gzip_level: int = 6  # 1 (fastest) - 9 (smallest)
+    compression_brotli_quality: int = 4  # 0 - 11; above ~5 costs far more CPU for little gain on JSON
+    compression_zstd_level: int = 3  # 1 - 19
     
     # Circuit Breaker
     circuit_breaker_enabled: bool = True
     circuit_breaker_failure_threshold: int = 5
     circuit_breaker_recovery_timeout: int = 30
+    circuit_breaker_window_seconds: int = 60  # Rolling window for error rate and latency
+    circuit_breaker_min_samples: int = 10  # Queries needed in the window before rates are judged
+    circuit_breaker_error_rate: float = 0.5  # Open when this share of windowed queries fail
+    circuit_breaker_latency_p95_ms: int = 2000  # Open when Pastel's p95 execute time degrades past this
+    circuit_breaker_half_open_max_probes: int = 1  # Concurrent probe queries allowed while half-open
+    circuit_breaker_half_open_successes: int = 3  # Healthy probes needed to close again
     query_timeout_seconds: int = 2  # Alert if queries exceed this
+    query_deadline_seconds: int = 10  # Cancel queries (cursor.cancel) still running this long after the request arrived
+    page_time_budget_seconds: float = 5.0  # Return a partial page with a continuation cursor after this long (0 = off)
+    query_cancel_grace_seconds: float = 2.0  # Answer 504 even if the driver hasn't honoured the cancel by then
     
     # SSL - Optional strings
     ssl_cert_file: Optional[str] = ""
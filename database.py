@@ -1,28 +1,690 @@
 import pyodbc
+from collections import OrderedDict, deque
 from contextlib import contextmanager
-from threading import Semaphore, Event
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from enum import IntEnum
+from heapq import heappop, heappush
+from itertools import count
+from threading import Condition, Event, Lock, Semaphore, Thread, local
+import asyncio
 import logging
+import math
 from config import settings
 import time
 
 logger = logging.getLogger(__name__)
 
-# Connection pool semaphore to limit concurrent connections
-connection_semaphore = Semaphore(settings.max_connections)
+# Per-thread time spent inside cursor.execute for the current checkout
+_query_stats = local()
+
+class Priority(IntEnum):
+    """Admission classes - lower values are served first"""
+    HIGH = 0  # Health checks
+    MEDIUM = 1  # Recent data and single-record lookups
+    LOW = 2  # Historical backfills
+
+def priority_for_dates(from_date=None, to_date=None):
+    """Recent date ranges are medium priority; open-ended or old ranges are historical backfills"""
+    if from_date is None:
+        return Priority.LOW
+    horizon = date.today() - timedelta(days=settings.priority_recent_days)
+    if from_date < horizon or (to_date is not None and to_date < horizon):
+        return Priority.LOW
+    return Priority.MEDIUM
+
+def admission_timeout(priority):
+    """How long a request of this class may wait for a slot before it is shed"""
+    if priority == Priority.HIGH:
+        return settings.admission_timeout_high
+    if priority == Priority.MEDIUM:
+        return settings.admission_timeout_medium
+    return settings.connection_acquire_timeout
+
+class WaitHistogram:
+    """Cumulative histogram of admission wait times"""
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.counts[bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+    
+    def snapshot(self):
+        buckets = {}
+        running = 0
+        for bound, n in zip(self.BUCKETS_MS + ("inf",), self.counts):
+            running += n
+            buckets[f"le_{bound}ms" if bound != "inf" else "le_inf"] = running
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else None,
+            "buckets": buckets
+        }
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight Pastel queries, driven by observed execute latency
+    
+    The limit grows by one per limit-worth of fast queries and is cut
+    multiplicatively when smoothed latency passes the target or a query fails,
+    so we back off while desktop users are busy and open up when Pastel is idle.
+    """
+    
+    def __init__(self, max_limit):
+        self.min_limit = 1
+        self.max_limit = max(1, max_limit)
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latency_ewma = None
+        self._cond = Condition()
+        self._last_decrease = 0.0
+        
+        # Waiting requests as [priority, arrival, waiting] - served by priority, then FIFO
+        self._waiters = []
+        self._arrivals = count()
+        
+        # Counters exposed through /api/metrics
+        self.increases = 0
+        self.decreases = 0
+        self.rejected = 0
+        self.admitted_waits = {p: WaitHistogram() for p in Priority}
+        self.shed = {p: 0 for p in Priority}
+    
+    def _drop_abandoned(self):
+        while self._waiters and not self._waiters[0][2]:
+            heappop(self._waiters)
+    
+    def acquire(self, timeout, priority=Priority.MEDIUM):
+        """Wait for a slot in priority order; False if the deadline passes first"""
+        start_time = time.time()
+        deadline = start_time + timeout
+        entry = [priority, next(self._arrivals), True]
+        with self._cond:
+            heappush(self._waiters, entry)
+            while True:
+                self._drop_abandoned()
+                if self._waiters[0] is entry and self.in_flight < int(self.limit):
+                    heappop(self._waiters)
+                    self.in_flight += 1
+                    self.admitted_waits[priority].observe(time.time() - start_time)
+                    # Another slot may still be free for the next waiter
+                    self._cond.notify_all()
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    # Deadline-based shedding: leave the queue rather than wait on
+                    entry[2] = False
+                    self.rejected += 1
+                    self.shed[priority] += 1
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+    
+    def try_acquire(self):
+        """Take a free slot without queueing (background work that can simply skip a turn)"""
+        with self._cond:
+            self._drop_abandoned()
+            if self._waiters or self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+    
+    @property
+    def waiting(self):
+        with self._cond:
+            return sum(1 for entry in self._waiters if entry[2])
+    
+    def release(self, latency=None, ok=True):
+        with self._cond:
+            self.in_flight -= 1
+            if latency is not None and settings.adaptive_concurrency_enabled:
+                self._adjust(latency, ok)
+            self._cond.notify_all()
+    
+    def _adjust(self, latency, ok):
+        alpha = settings.adaptive_latency_smoothing
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = alpha * latency + (1 - alpha) * self.latency_ewma
+        
+        now = time.time()
+        overloaded = not ok or self.latency_ewma * 1000 > settings.adaptive_latency_target_ms
+        if overloaded:
+            # One cut per target interval so a single slow burst doesn't collapse the limit
+            if now - self._last_decrease >= settings.adaptive_latency_target_ms / 1000:
+                new_limit = max(self.min_limit, self.limit * settings.adaptive_decrease_factor)
+                if int(new_limit) < int(self.limit):
+                    logger.info(f"Reducing Pastel concurrency limit to {int(new_limit)} (latency {self.latency_ewma * 1000:.0f}ms)")
+                self.limit = new_limit
+                self._last_decrease = now
+                self.decreases += 1
+        elif self.in_flight + 1 >= int(self.limit) and self.limit < self.max_limit:
+            # Only grow when the current limit is actually being used
+            new_limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if int(new_limit) > int(self.limit):
+                logger.info(f"Raising Pastel concurrency limit to {int(new_limit)}")
+            self.limit = new_limit
+            self.increases += 1
+    
+    def stats(self):
+        with self._cond:
+            return {
+                "enabled": settings.adaptive_concurrency_enabled,
+                "limit": int(self.limit),
+                "limit_exact": round(self.limit, 3),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self.in_flight,
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 2) if self.latency_ewma is not None else None,
+                "latency_target_ms": settings.adaptive_latency_target_ms,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "rejected": self.rejected
+            }
+    
+    def admission_stats(self):
+        with self._cond:
+            waiting = {p: 0 for p in Priority}
+            for entry in self._waiters:
+                if entry[2]:
+                    waiting[entry[0]] += 1
+            return {
+                p.name.lower(): {
+                    "waiting": waiting[p],
+                    "shed": self.shed[p],
+                    "timeout_ms": round(admission_timeout(p) * 1000),
+                    "wait": self.admitted_waits[p].snapshot()
+                }
+                for p in Priority
+            }
+
+# Limits concurrent Pastel queries; settings.max_connections is the ceiling
+concurrency_limiter = AdaptiveLimiter(settings.max_connections)
+
+class DatabaseUnavailableError(Exception):
+    """Pastel cannot take this request right now (returned to clients as 503)"""
+
+class QueryTimeoutError(Exception):
+    """A query ran past its deadline and was cancelled (returned to clients as 504)"""
+
+class CircuitOpenError(DatabaseUnavailableError):
+    """Raised when the circuit breaker is shedding database work"""
 
-# Circuit breaker state
 class CircuitBreaker:
+    """Closed / open / half-open breaker over a rolling window of errors and latency"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
     def __init__(self):
-        self.failure_count = 0
+        self._lock = Lock()
+        self.state = self.CLOSED
+        self.state_since = time.time()
+        self.failure_count = 0  # Consecutive failures
         self.last_failure_time = None
-        self.is_open = False
         
+        # (finished_at, latency_seconds, ok) for queries inside the rolling window
+        self._window = deque()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        
+        # Exported for dashboards
+        self.rejected = 0
+        self.transition_counts = {self.CLOSED: 0, self.OPEN: 0, self.HALF_OPEN: 0}
+        self.transitions = deque(maxlen=20)
+    
+    @property
+    def is_open(self):
+        return self.state == self.OPEN
+    
+    def _transition(self, state, reason):
+        logger.warning(f"Circuit breaker {self.state} -> {state}: {reason}")
+        self.transitions.append({
+            "from": self.state,
+            "to": state,
+            "reason": reason,
+            "at": datetime.utcnow().isoformat() + "Z"
+        })
+        self.transition_counts[state] += 1
+        self.state = state
+        self.state_since = time.time()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == self.CLOSED:
+            self._window.clear()
+            self.failure_count = 0
+    
+    def _trim(self, now):
+        horizon = now - settings.circuit_breaker_window_seconds
+        while self._window and self._window[0][0] < horizon:
+            self._window.popleft()
+    
+    def _window_stats(self):
+        samples = len(self._window)
+        if not samples:
+            return samples, 0.0, 0.0
+        errors = sum(1 for _, _, ok in self._window if not ok)
+        latencies = sorted(latency for _, latency, _ in self._window)
+        p95 = latencies[max(0, math.ceil(samples * 0.95) - 1)]
+        return samples, errors / samples, p95
+    
+    def _trip_reason(self):
+        if self.failure_count >= settings.circuit_breaker_failure_threshold:
+            return f"{self.failure_count} consecutive failures"
+        samples, error_rate, p95 = self._window_stats()
+        if samples < settings.circuit_breaker_min_samples:
+            return None
+        if error_rate >= settings.circuit_breaker_error_rate:
+            return f"error rate {error_rate:.0%} over {samples} queries"
+        if p95 * 1000 >= settings.circuit_breaker_latency_p95_ms:
+            return f"p95 latency {p95 * 1000:.0f}ms over {samples} queries"
+        return None
+    
+    def before_request(self):
+        """Admit a query or raise CircuitOpenError. Returns True if the query is a half-open probe"""
+        if not settings.circuit_breaker_enabled:
+            return False
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN:
+                if time.time() - self.state_since < settings.circuit_breaker_recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("Database circuit breaker is open - Pastel is failing or slow")
+                self._transition(self.HALF_OPEN, "recovery timeout elapsed")
+            
+            # Half-open: only a trickle of probe queries reach Pastel
+            if self._probes_in_flight >= settings.circuit_breaker_half_open_max_probes:
+                self.rejected += 1
+                raise CircuitOpenError("Database circuit breaker is half-open - probe already in flight")
+            self._probes_in_flight += 1
+            return True
+    
+    def cancel_probe(self, is_probe):
+        """Give back a probe slot for a query that never reached the database"""
+        if is_probe:
+            with self._lock:
+                if self.state == self.HALF_OPEN and self._probes_in_flight:
+                    self._probes_in_flight -= 1
+    
+    def record(self, latency, ok, is_probe=False):
+        if not settings.circuit_breaker_enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._window.append((now, latency, ok))
+            self._trim(now)
+            if ok:
+                self.failure_count = 0
+            else:
+                self.failure_count += 1
+                self.last_failure_time = now
+            
+            if self.state == self.HALF_OPEN:
+                if not is_probe:
+                    return
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not ok:
+                    self._transition(self.OPEN, "probe query failed")
+                elif latency * 1000 >= settings.circuit_breaker_latency_p95_ms:
+                    self._transition(self.OPEN, f"probe query took {latency * 1000:.0f}ms")
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= settings.circuit_breaker_half_open_successes:
+                        self._transition(self.CLOSED, f"{self._probe_successes} healthy probes")
+            elif self.state == self.CLOSED:
+                reason = self._trip_reason()
+                if reason:
+                    self._transition(self.OPEN, reason)
+    
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.time())
+            samples, error_rate, p95 = self._window_stats()
+            return {
+                "enabled": settings.circuit_breaker_enabled,
+                "state": self.state,
+                "state_since": datetime.utcfromtimestamp(self.state_since).isoformat() + "Z",
+                "failure_count": self.failure_count,
+                "window_seconds": settings.circuit_breaker_window_seconds,
+                "window_samples": samples,
+                "window_error_rate": round(error_rate, 4),
+                "window_p95_ms": round(p95 * 1000, 2),
+                "probes_in_flight": self._probes_in_flight,
+                "rejected": self.rejected,
+                "transition_counts": dict(self.transition_counts),
+                "recent_transitions": list(self.transitions)
+            }
+
 circuit_breaker = CircuitBreaker()
 
+class DatabaseBusyError(DatabaseUnavailableError):
+    """Raised when no database slot or executor thread is free in time"""
+
+class DatabaseExecutor:
+    """Bounded thread pool that runs blocking ODBC work off the event loop
+    
+    There is a thread for every accepted job so queued work waits in the
+    limiter's priority queue rather than in the executor's FIFO; anything
+    beyond max_workers is rejected immediately.
+    """
+    
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pastel-db")
+        self._lock = Lock()
+        
+        # Work submitted but not finished
+        self._pending = 0
+        
+        # Counters exposed through /api/metrics
+        self.submitted = 0
+        self.rejected = 0
+        self.max_queue_depth_seen = 0
+    
+    @property
+    def queue_depth(self):
+        """Accepted work not yet running a query against Pastel"""
+        with self._lock:
+            return max(0, self._pending - concurrency_limiter.in_flight)
+    
+    def _call(self, func, args):
+        try:
+            return func(*args)
+        finally:
+            # Counted down in the worker so a cancelled await doesn't hide running work
+            with self._lock:
+                self._pending -= 1
+    
+    async def run(self, func, *args):
+        """Run a blocking function in the executor and await its result"""
+        with self._lock:
+            if self._pending >= self.max_workers:
+                self.rejected += 1
+                raise DatabaseBusyError("Database executor queue is full")
+            self._pending += 1
+            self.submitted += 1
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, self._pending - concurrency_limiter.in_flight)
+        
+        try:
+            future = self._executor.submit(self._call, func, args)
+        except RuntimeError:
+            # Executor is shutting down - _call will never run
+            with self._lock:
+                self._pending -= 1
+            raise
+        return await asyncio.wrap_future(future)
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+            return {
+                "workers": self.max_workers,
+                "max_queue": settings.db_executor_max_queue,
+                "pending": pending,
+                "queue_depth": max(0, pending - concurrency_limiter.in_flight),
+                "max_queue_depth_seen": self.max_queue_depth_seen,
+                "submitted": self.submitted,
+                "rejected": self.rejected
+            }
+
+db_executor = DatabaseExecutor(settings.max_connections + settings.db_executor_max_queue)
+
+def iter_batches(cursor, max_rows=None, batch_size=None):
+    """Yield rows in fetchmany batches so only one batch is held in memory at a time"""
+    batch_size = batch_size or settings.fetch_batch_size
+    cursor.arraysize = batch_size
+    fetched = 0
+    while max_rows is None or fetched < max_rows:
+        size = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        fetched += len(rows)
+        yield rows
+
+def fetch_page(cursor, limit, map_row):
+    """Map up to limit rows batch by batch, using one extra row to detect has_more
+    
+    Returns (items, has_more, truncated). Once the page time budget is spent
+    the rows mapped so far are returned with has_more set, so the caller's
+    next_cursor continues after the last returned key; the first batch is
+    always kept so a truncated page still makes progress.
+    """
+    items = []
+    budget = settings.page_time_budget_seconds
+    budget_end = getattr(_query_stats, "started_at", None) or time.time()
+    budget_end += budget
+    for rows in iter_batches(cursor, limit + 1):
+        for row in rows:
+            if len(items) == limit:
+                return items, True, False
+            items.append(map_row(row))
+        if budget and items and len(items) < limit and time.time() >= budget_end:
+            logger.info(f"Page time budget of {budget}s spent after {len(items)} of {limit} rows - returning a partial page")
+            return items, True, True
+    return items, False, False
+
+class QueryWatch:
+    """A cursor being watched until its request deadline"""
+    __slots__ = ("cursor", "sql", "deadline", "cancelled", "active")
+    
+    def __init__(self, cursor, sql, deadline):
+        self.cursor = cursor
+        self.sql = sql
+        self.deadline = deadline
+        self.cancelled = False
+        self.active = True
+
+class QueryWatchdog:
+    """Cancels cursors from a separate thread once their deadline passes
+    
+    The Pervasive driver ignores conn.timeout, so this is the only way to stop
+    a runaway scan; cursor.cancel() makes the blocked execute/fetch raise in
+    its own thread, which then releases the connection slot.
+    """
+    
+    def __init__(self):
+        self._cond = Condition()
+        self._watches = []
+        self._arrivals = count()
+        self._thread = None
+        
+        # Counters exposed through /api/metrics
+        self.cancelled = 0
+        self.cancel_failures = 0
+    
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="pastel-query-watchdog", daemon=True)
+            self._thread.start()
+    
+    def watch(self, cursor, sql, deadline):
+        watch = QueryWatch(cursor, sql, deadline)
+        with self._cond:
+            self._ensure_thread()
+            heappush(self._watches, (deadline, next(self._arrivals), watch))
+            self._cond.notify()
+        return watch
+    
+    def unwatch(self, watch):
+        """Stop watching; True if the watchdog cancelled the cursor
+        
+        Takes the lock the cancel runs under, so a cancel is never still in
+        flight once this returns - it can't hit a later query on the connection.
+        """
+        with self._cond:
+            watch.active = False
+            return watch.cancelled
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._watches and not self._watches[0][2].active:
+                    heappop(self._watches)
+                if not self._watches:
+                    self._cond.wait()
+                    continue
+                deadline, _, watch = self._watches[0]
+                remaining = deadline - time.time()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                heappop(self._watches)
+                watch.active = False
+                watch.cancelled = True
+                
+                # Under the lock, so unwatch() can't return (and the connection be
+                # reused) while the cancel is still on its way to the driver
+                logger.warning(f"Cancelling query that passed its deadline: {watch.sql}")
+                try:
+                    watch.cursor.cancel()
+                    self.cancelled += 1
+                except pyodbc.Error as e:
+                    self.cancel_failures += 1
+                    logger.error(f"Failed to cancel query: {e}")
+    
+    def stats(self):
+        with self._cond:
+            watching = sum(1 for _, _, watch in self._watches if watch.active)
+        return {
+            "deadline_seconds": settings.query_deadline_seconds,
+            "watching": watching,
+            "cancelled": self.cancelled,
+            "cancel_failures": self.cancel_failures
+        }
+
+query_watchdog = QueryWatchdog()
+
+class StatementCache:
+    """SQL text per table and filter combination, so identical requests reuse one statement"""
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._statements = OrderedDict()
+        self._lock = Lock()
+        
+        # Counters exposed through /api/metrics
+        self.hits = 0
+        self.misses = 0
+        self.prepared = 0
+        self.reused = 0
+        self.prepare_time_total = 0.0
+        self.reused_time_total = 0.0
+    
+    def get(self, key, build_query):
+        with self._lock:
+            sql = self._statements.get(key)
+            if sql is not None:
+                self._statements.move_to_end(key)
+                self.hits += 1
+                return sql
+        
+        sql = build_query()
+        with self._lock:
+            self.misses += 1
+            self._statements[key] = sql
+            if len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+        return sql
+    
+    def record_execute(self, seconds, reused):
+        with self._lock:
+            if reused:
+                self.reused += 1
+                self.reused_time_total += seconds
+            else:
+                self.prepared += 1
+                self.prepare_time_total += seconds
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._statements),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "statements_prepared": self.prepared,
+                "statements_reused": self.reused,
+                "avg_prepare_execute_ms": round(self.prepare_time_total / self.prepared * 1000, 2) if self.prepared else None,
+                "avg_reused_execute_ms": round(self.reused_time_total / self.reused * 1000, 2) if self.reused else None
+            }
+
+statement_cache = StatementCache(settings.statement_cache_size)
+
+def execute_cached(conn, key, build_query, params):
+    """Execute the cached SQL for key, on a cursor that already has it prepared when possible"""
+    sql = statement_cache.get(key, build_query)
+    cursor, reused = db_pool.cursor_for(conn, sql)
+    
+    # Watched until the connection is released, so slow fetches are covered too
+    deadline = getattr(_query_stats, "deadline", None)
+    if deadline is not None:
+        if time.time() >= deadline:
+            raise QueryTimeoutError("Request deadline passed before the query could start")
+        _query_stats.watches.append(query_watchdog.watch(cursor, sql, deadline))
+    
+    start_time = time.time()
+    cursor.execute(sql, params)
+    execute_time = time.time() - start_time
+    statement_cache.record_execute(execute_time, reused)
+    _query_stats.execute_time = getattr(_query_stats, "execute_time", 0.0) + execute_time
+    return cursor
+
+class PooledConnection:
+    """A pyodbc connection kept warm between requests"""
+    __slots__ = ("conn", "created_at", "last_used_at", "cursors")
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.time()
+        self.last_used_at = self.created_at
+        # pyodbc skips SQLPrepare when a cursor re-executes the SQL it last ran,
+        # so keep one cursor per statement for the life of the connection
+        self.cursors = OrderedDict()
+
 class DatabasePool:
     def __init__(self):
         self.connection_string = self._build_connection_string()
         
+        # Idle connections, most recently used last (LIFO keeps one connection hot)
+        self._idle = []
+        self._checked_out = {}
+        self._lock = Lock()
+        
+        # Counters exposed through /api/metrics
+        self.connects = 0
+        self.reuses = 0
+        self.validation_failures = 0
+        self.expired_idle = 0
+        self.expired_lifetime = 0
+        self.discarded_on_error = 0
+        self.connect_time_total = 0.0
+        
+        # Requests served on a connection opened for them vs. one already warm
+        self.cold_requests = 0
+        self.cold_request_time_total = 0.0
+        self.warm_requests = 0
+        self.warm_request_time_total = 0.0
+        
+        self.warmed_up = 0
+        self.warmup_ms = None
+        self.keepalive_pings = 0
+        self.keepalive_failures = 0
+        self._keepalive_thread = None
+        self._keepalive_stop = Event()
+        
     def _build_connection_string(self):
         base = f"DSN={settings.dsn_name}"
         if settings.db_user:
@@ -32,55 +694,394 @@ class DatabasePool:
         base += f";Timeout={settings.connection_timeout}"
         return base
     
+    def _connect(self):
+        start_time = time.time()
+        conn = pyodbc.connect(self.connection_string)
+        connect_time = time.time() - start_time
+        with self._lock:
+            self.connects += 1
+            self.connect_time_total += connect_time
+        logger.debug(f"Opened new database connection in {connect_time:.3f}s")
+        return PooledConnection(conn)
+    
+    def cursor_for(self, conn, sql):
+        """Return (cursor, reused) with the cursor that last executed sql on this connection"""
+        with self._lock:
+            pooled = self._checked_out.get(id(conn))
+        if pooled is None:
+            return conn.cursor(), False
+        
+        cursor = pooled.cursors.get(sql)
+        if cursor is not None:
+            pooled.cursors.move_to_end(sql)
+            return cursor, True
+        
+        cursor = conn.cursor()
+        pooled.cursors[sql] = cursor
+        if len(pooled.cursors) > settings.statement_cache_per_connection:
+            _, oldest = pooled.cursors.popitem(last=False)
+            try:
+                oldest.close()
+            except pyodbc.Error:
+                pass
+        return cursor, False
+    
+    def _close(self, pooled):
+        pooled.cursors.clear()
+        try:
+            pooled.conn.close()
+        except pyodbc.Error as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+    
+    def _validate(self, pooled):
+        """Cheap round trip to make sure Pervasive has not dropped the session"""
+        try:
+            cursor = pooled.conn.cursor()
+            cursor.execute("SELECT 1 as test")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error as e:
+            logger.warning(f"Discarding pooled connection that failed validation: {e}")
+            return False
+    
+    def _checkout(self):
+        """Return (pooled, cold) - cold when the connection had to be opened for this request"""
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                return self._connect(), True
+            
+            now = time.time()
+            if now - pooled.created_at > settings.pool_max_lifetime_seconds:
+                self.expired_lifetime += 1
+                self._close(pooled)
+                continue
+            if now - pooled.last_used_at > settings.pool_max_idle_seconds:
+                self.expired_idle += 1
+                self._close(pooled)
+                continue
+            
+            # Connections used moments ago are known good - skip the round trip
+            if now - pooled.last_used_at > settings.pool_validation_interval_seconds:
+                if not self._validate(pooled):
+                    self.validation_failures += 1
+                    self._close(pooled)
+                    continue
+            
+            with self._lock:
+                self.reuses += 1
+            return pooled, False
+    
+    def _release(self, pooled, healthy):
+        if not healthy:
+            self.discarded_on_error += 1
+            self._close(pooled)
+            return
+        
+        now = time.time()
+        if now - pooled.created_at > settings.pool_max_lifetime_seconds:
+            self.expired_lifetime += 1
+            self._close(pooled)
+            return
+        
+        try:
+            # End any implicit read transaction so no locks are held while idle
+            pooled.conn.rollback()
+        except pyodbc.Error as e:
+            logger.warning(f"Discarding connection that failed rollback: {e}")
+            self.discarded_on_error += 1
+            self._close(pooled)
+            return
+        
+        pooled.last_used_at = now
+        with self._lock:
+            self._idle.append(pooled)
+    
+    def warm_up(self):
+        """Open and validate connections before the first request needs them
+        
+        DSN resolution and driver loading happen here instead of inside the
+        first CRM request's admission timeout. Failures are logged, not raised,
+        so the API still starts while Pastel is down.
+        """
+        target = min(settings.pool_warmup_connections, settings.max_connections)
+        start_time = time.time()
+        warmed = []
+        for _ in range(target):
+            try:
+                pooled = self._connect()
+            except pyodbc.Error as e:
+                logger.error(f"Connection warm-up failed: {e}")
+                break
+            if not self._validate(pooled):
+                self._close(pooled)
+                break
+            warmed.append(pooled)
+        
+        with self._lock:
+            self._idle.extend(warmed)
+        self.warmed_up = len(warmed)
+        self.warmup_ms = round((time.time() - start_time) * 1000, 2)
+        logger.info(f"Warmed up {len(warmed)} of {target} database connections in {self.warmup_ms}ms")
+        return len(warmed)
+    
+    def _keepalive(self):
+        """Ping idle connections so Pervasive doesn't drop quiet sessions"""
+        # Only when no request wants the slot - keep-alive never competes with real work
+        if not concurrency_limiter.try_acquire():
+            return
+        try:
+            now = time.time()
+            with self._lock:
+                due = [pooled for pooled in self._idle[-settings.pool_warmup_connections:]
+                       if now - pooled.last_used_at >= settings.pool_keepalive_interval_seconds]
+                for pooled in due:
+                    self._idle.remove(pooled)
+            
+            for pooled in due:
+                self.keepalive_pings += 1
+                if self._validate(pooled):
+                    pooled.last_used_at = time.time()
+                    with self._lock:
+                        self._idle.append(pooled)
+                else:
+                    self.keepalive_failures += 1
+                    self._close(pooled)
+            
+            # Replace sessions that were dropped so the next request is still warm
+            with self._lock:
+                missing = settings.pool_warmup_connections - len(self._idle) - len(self._checked_out)
+            if missing > 0 and not circuit_breaker.is_open:
+                try:
+                    pooled = self._connect()
+                    with self._lock:
+                        self._idle.append(pooled)
+                except pyodbc.Error as e:
+                    self.keepalive_failures += 1
+                    logger.warning(f"Keep-alive could not reopen a connection: {e}")
+        finally:
+            concurrency_limiter.release()
+    
+    def start_keepalive(self):
+        if not settings.pool_keepalive_interval_seconds or self._keepalive_thread is not None:
+            return
+        
+        def loop():
+            while not self._keepalive_stop.wait(settings.pool_keepalive_interval_seconds):
+                try:
+                    self._keepalive()
+                except Exception as e:
+                    logger.error(f"Connection keep-alive failed: {e}")
+        
+        self._keepalive_thread = Thread(target=loop, name="pastel-keepalive", daemon=True)
+        self._keepalive_thread.start()
+    
+    def stop_keepalive(self):
+        self._keepalive_stop.set()
+    
+    def _record_request(self, cold, elapsed):
+        with self._lock:
+            if cold:
+                self.cold_requests += 1
+                self.cold_request_time_total += elapsed
+            else:
+                self.warm_requests += 1
+                self.warm_request_time_total += elapsed
+    
+    def close_all(self):
+        """Close every idle connection (used on shutdown)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled)
+        logger.info(f"Closed {len(idle)} pooled database connections")
+    
+    def stats(self):
+        with self._lock:
+            idle_count = len(self._idle)
+        return {
+            "max_connections": settings.max_connections,
+            "idle_connections": idle_count,
+            "connects": self.connects,
+            "reuses": self.reuses,
+            "validation_failures": self.validation_failures,
+            "expired_idle": self.expired_idle,
+            "expired_lifetime": self.expired_lifetime,
+            "discarded_on_error": self.discarded_on_error,
+            "avg_connect_ms": round(self.connect_time_total / self.connects * 1000, 2) if self.connects else None,
+            "cold_requests": self.cold_requests,
+            "avg_cold_request_ms": round(self.cold_request_time_total / self.cold_requests * 1000, 2) if self.cold_requests else None,
+            "warm_requests": self.warm_requests,
+            "avg_warm_request_ms": round(self.warm_request_time_total / self.warm_requests * 1000, 2) if self.warm_requests else None,
+            "warmed_up": self.warmed_up,
+            "warmup_ms": self.warmup_ms,
+            "keepalive_pings": self.keepalive_pings,
+            "keepalive_failures": self.keepalive_failures
+        }
+    
+    async def run(self, work, *args, priority=Priority.MEDIUM, timeout=None):
+        """Run work(conn, *args) on a pooled connection without blocking the event loop
+        
+        The request deadline covers queueing and the query itself; queries still
+        running at the deadline are cancelled by the watchdog.
+        """
+        timeout = timeout or settings.query_deadline_seconds
+        deadline = time.time() + timeout
+        
+        def run_with_connection():
+            with self.get_connection(priority, deadline) as conn:
+                return work(conn, *args)
+        
+        # Shielded so a timed-out or disconnected request doesn't lose track of the worker
+        task = asyncio.ensure_future(db_executor.run(run_with_connection))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout + settings.query_cancel_grace_seconds)
+        except asyncio.TimeoutError:
+            # The driver didn't honour the cancel in time - answer the client anyway
+            logger.error(f"Query still running {settings.query_cancel_grace_seconds}s after its {timeout}s deadline")
+            raise QueryTimeoutError(f"Query exceeded its {timeout}s deadline")
+    
+    async def stream(self, work, *args, priority=Priority.LOW, timeout=None):
+        """Run the generator work(conn, *args) on a pooled connection and return an async iterator over its chunks
+        
+        The connection is held until the generator is exhausted or the consumer
+        stops reading. At most export_queue_batches chunks are buffered, so a
+        slow client slows the fetch down instead of growing memory; one that
+        reads nothing for export_stall_timeout_seconds is cut off. The first
+        chunk is awaited before returning, so admission and query errors still
+        surface as 503/504 rather than a broken stream.
+        """
+        timeout = timeout or settings.export_deadline_seconds
+        deadline = time.time() + timeout
+        loop = asyncio.get_running_loop()
+        # Unbounded so the end/error marker never blocks - data chunks are bounded by slots
+        chunks = asyncio.Queue()
+        slots = Semaphore(settings.export_queue_batches)
+        stopped = Event()
+        
+        def send(item):
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        
+        def produce():
+            try:
+                with self.get_connection(priority, deadline) as conn:
+                    for chunk in work(conn, *args):
+                        # Wait for buffer room; a client that stops reading (or never starts) releases the connection
+                        stall = min(settings.export_stall_timeout_seconds, max(0.0, deadline - time.time()))
+                        if not slots.acquire(timeout=stall):
+                            if time.time() >= deadline:
+                                raise QueryTimeoutError(f"Export still streaming at its {timeout}s deadline")
+                            raise QueryTimeoutError(f"Export client read nothing for {settings.export_stall_timeout_seconds}s")
+                        if stopped.is_set():
+                            break
+                        send((chunk, None))
+            except BaseException as e:
+                send((None, e))
+            else:
+                send((None, None))
+        
+        def rejected(task):
+            # produce() reports its own errors - this only fires if it never ran
+            if not task.cancelled() and task.exception() is not None:
+                chunks.put_nowait((None, task.exception()))
+        
+        task = asyncio.ensure_future(db_executor.run(produce))
+        task.add_done_callback(rejected)
+        
+        first = await chunks.get()
+        if first[1] is not None:
+            raise first[1]
+        
+        async def iterate(item):
+            try:
+                while True:
+                    chunk, error = item
+                    if error is not None:
+                        # Headers are already sent - all we can do is cut the stream short
+                        logger.error(f"Stream aborted: {error}")
+                        raise error
+                    if chunk is None:
+                        return
+                    slots.release()
+                    yield chunk
+                    item = await chunks.get()
+            finally:
+                # Wake the worker if it is waiting for buffer room; it stops before its next chunk
+                stopped.set()
+                slots.release()
+        
+        return iterate(first)
+    
     @contextmanager
-    def get_connection(self):
+    def get_connection(self, priority=Priority.MEDIUM, deadline=None):
         # Check circuit breaker
-        if circuit_breaker.is_open:
-            if time.time() - circuit_breaker.last_failure_time < settings.circuit_breaker_recovery_timeout:
-                raise Exception("Database circuit breaker is open - too many failures")
-            else:
-                # Try to close circuit breaker
-                circuit_breaker.is_open = False
-                circuit_breaker.failure_count = 0
+        is_probe = circuit_breaker.before_request()
         
-        # Try to acquire connection with timeout
-        acquired = connection_semaphore.acquire(timeout=settings.connection_acquire_timeout)
+        # Wait for a slot in priority order, shedding the request at its class deadline
+        acquired = concurrency_limiter.acquire(admission_timeout(priority), priority)
         if not acquired:
-            logger.warning("Failed to acquire database connection within timeout")
-            raise Exception("Database connection pool exhausted")
+            circuit_breaker.cancel_probe(is_probe)
+            logger.warning(f"Failed to acquire database connection within timeout ({priority.name.lower()} priority)")
+            raise DatabaseBusyError("Database connection pool exhausted")
             
-        conn = None
+        pooled = None
+        healthy = True
         start_time = time.time()
+        _query_stats.execute_time = 0.0
+        _query_stats.started_at = start_time
+        _query_stats.deadline = deadline or start_time + settings.query_deadline_seconds
+        _query_stats.watches = []
         try:
-            conn = pyodbc.connect(self.connection_string)
+            pooled, cold = self._checkout()
+            with self._lock:
+                self._checked_out[id(pooled.conn)] = pooled
             # Set query timeout
             # conn.timeout = settings.query_timeout_seconds  # Commented out - Pervasive SQL driver doesn't support this
-            yield conn
+            yield pooled.conn
             
-            # Reset failure count on success
-            circuit_breaker.failure_count = 0
+            # Pastel latency is the time spent executing, not our own row mapping
+            circuit_breaker.record(_query_stats.execute_time, True, is_probe)
             
         except pyodbc.Error as e:
+            # A connection that raised a driver error is not trusted for reuse
+            healthy = False
             query_time = time.time() - start_time
-            logger.error(f"Database error after {query_time:.2f}s: {e}")
             
             # Update circuit breaker
-            circuit_breaker.failure_count += 1
-            circuit_breaker.last_failure_time = time.time()
+            circuit_breaker.record(query_time, False, is_probe)
             
-            if circuit_breaker.failure_count >= settings.circuit_breaker_failure_threshold:
-                circuit_breaker.is_open = True
-                logger.error("Opening database circuit breaker due to repeated failures")
-                
+            if any(watch.cancelled for watch in _query_stats.watches):
+                logger.error(f"Query cancelled after {query_time:.2f}s at its deadline")
+                raise QueryTimeoutError(f"Query cancelled after exceeding its deadline ({query_time:.1f}s)") from e
+            
+            logger.error(f"Database error after {query_time:.2f}s: {e}")
+            raise
+        except BaseException:
+            # Not a database failure (e.g. a 404) - Pastel answered normally
+            circuit_breaker.record(_query_stats.execute_time, True, is_probe)
             raise
         finally:
-            if conn:
-                conn.close()
-            connection_semaphore.release()
+            for watch in _query_stats.watches:
+                if query_watchdog.unwatch(watch):
+                    # A cancelled cursor (and its connection) is not trusted for reuse
+                    healthy = False
+            _query_stats.watches = []
+            _query_stats.deadline = None
+            _query_stats.started_at = None
+            
+            if pooled:
+                with self._lock:
+                    self._checked_out.pop(id(pooled.conn), None)
+                self._record_request(cold, time.time() - start_time)
+                self._release(pooled, healthy)
+            concurrency_limiter.release(_query_stats.execute_time if healthy else time.time() - start_time, healthy)
             
             # Log if query took too long
             query_time = time.time() - start_time
             if query_time > settings.query_timeout_seconds:
                 logger.warning(f"Query exceeded timeout threshold: {query_time:.2f}s")
 
-db_pool = DatabasePool()
\ No newline at end of file
+db_pool = DatabasePool()
@@ -0,0 +1,112 @@
+"""Date and timestamp parsing for Pastel text dates, memoized per distinct string
+
+Pastel returns some date columns as DD/MM/YYYY (or ISO) text, and a page of
+history lines or ledger transactions repeats the same few dates thousands of
+times. Each parser keeps a bounded memo of string -> value, so a page parses
+every distinct date once. The two known layouts are sliced by hand; anything
+else falls back to strptime/fromisoformat exactly as before.
+
+Unparseable text still becomes None, but is counted (with a few recent
+examples) in /api/metrics instead of vanishing silently.
+"""
+from collections import deque
+from config import settings
+from datetime import date, datetime
+from threading import Lock
+
+_MISSING = object()
+
+def _digits(text, start, end):
+    part = text[start:end]
+    if not part.isdigit():
+        raise ValueError(f"not a date: {text!r}")
+    return int(part)
+
+def parse_date(text):
+    """DD/MM/YYYY or ISO text -> date; ValueError if neither"""
+    if len(text) == 10:
+        if text[2] == "/" and text[5] == "/":
+            return date(_digits(text, 6, 10), _digits(text, 3, 5), _digits(text, 0, 2))
+        if text[4] == "-" and text[7] == "-":
+            return date(_digits(text, 0, 4), _digits(text, 5, 7), _digits(text, 8, 10))
+    if "/" in text:
+        return datetime.strptime(text, "%d/%m/%Y").date()
+    return datetime.fromisoformat(text).date()
+
+def parse_datetime(text):
+    """DD/MM/YYYY HH:MM:SS or ISO text -> datetime; ValueError if neither"""
+    if len(text) == 19 and text[2] == "/" and text[5] == "/" and text[10] == " " and text[13] == ":" and text[16] == ":":
+        return datetime(
+            _digits(text, 6, 10), _digits(text, 3, 5), _digits(text, 0, 2),
+            _digits(text, 11, 13), _digits(text, 14, 16), _digits(text, 17, 19)
+        )
+    if "/" in text:
+        return datetime.strptime(text, "%d/%m/%Y %H:%M:%S")
+    return datetime.fromisoformat(text)
+
+def parse_iso_datetime(text):
+    """ISO text -> datetime; ValueError otherwise"""
+    return datetime.fromisoformat(text)
+
+class MemoParser:
+    """Column converter: parses text with parse, remembering up to max_size distinct strings
+    
+    Non-text values (drivers that return real dates) and empty strings pass
+    through unchanged. The memo is shared by all DB worker threads; when full
+    it is simply cleared, which is cheap and keeps the hot dates of the
+    current pages.
+    """
+    
+    def __init__(self, name, parse, max_size):
+        self.name = name
+        self._parse = parse
+        self.max_size = max_size
+        self._memo = {}
+        self._lock = Lock()
+        
+        # Counters exposed through /api/metrics
+        self.parsed = 0
+        self.failures = 0
+        self.recent_failures = deque(maxlen=5)
+    
+    def __call__(self, value):
+        if not value or not isinstance(value, str):
+            return value
+        result = self._memo.get(value, _MISSING)
+        if result is _MISSING:
+            try:
+                result = self._parse(value)
+            except ValueError:
+                result = None
+            with self._lock:
+                self.parsed += 1
+                if len(self._memo) >= self.max_size:
+                    self._memo.clear()
+                self._memo[value] = result
+        if result is None:
+            # Failures are memoized too, but every cell is counted
+            with self._lock:
+                self.failures += 1
+                self.recent_failures.append(value)
+        return result
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": len(self._memo),
+                "parsed": self.parsed,
+                "failures": self.failures,
+                "recent_failures": list(self.recent_failures)
+            }
+
+# The column converters the tables use
+date_value = MemoParser("date", parse_date, settings.date_cache_size)
+datetime_value = MemoParser("datetime", parse_datetime, settings.date_cache_size)
+iso_datetime_value = MemoParser("iso_datetime", parse_iso_datetime, settings.date_cache_size)
+
+def date_stats():
+    """Per-parser memo and failure counters for /api/metrics"""
+    return {
+        "cache_size": settings.date_cache_size,
+        "parsers": {parser.name: parser.stats() for parser in (date_value, datetime_value, iso_datetime_value)}
+    }
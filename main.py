@@ -5,7 +5,11 @@ import logging
 from datetime import datetime
 import uvicorn
 from config import settings
-from routers import health, invoices, customers, delivery_addresses, history_lines, inventory, inventory_categories, inventory_groups, ledger_transactions
+from database import db_pool, db_executor, DatabaseUnavailableError, QueryTimeoutError
+from responses import ModelResponse
+from tables import InvalidFieldsError
+from compression import CompressionMiddleware
+from routers import health, invoices, customers, delivery_addresses, history_lines, inventory, inventory_categories, inventory_groups, ledger_transactions, exports, summaries, sync
 import time
 import json
 
@@ -24,7 +28,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Pastel Bridge API",
     description="Bridge API for Pastel Partner integration",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ModelResponse
 )
 
 # CORS middleware
@@ -155,6 +160,34 @@ async def rate_limit(request: Request, call_next):
     
     return await call_next(request)
 
+# Compression wraps everything above so error responses and streamed exports are covered too
+app.add_middleware(CompressionMiddleware)
+
+# Database back-pressure and deadlines map to 503/504 instead of a generic 500
+@app.exception_handler(DatabaseUnavailableError)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailableError):
+    logger.warning(f"Database unavailable for {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"X-Retry-After": "5"}
+    )
+
+@app.exception_handler(QueryTimeoutError)
+async def query_timeout_handler(request: Request, exc: QueryTimeoutError):
+    logger.warning(f"Query deadline exceeded for {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": str(exc)}
+    )
+
+@app.exception_handler(InvalidFieldsError)
+async def invalid_fields_handler(request: Request, exc: InvalidFieldsError):
+    return JSONResponse(
+        status_code=400,
+        content={"detail": str(exc)}
+    )
+
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(invoices.router, prefix="/api", tags=["invoices"])
@@ -165,6 +198,21 @@ app.include_router(inventory.router, prefix="/api", tags=["inventory"])
 app.include_router(inventory_categories.router, prefix="/api", tags=["inventory-categories"])
 app.include_router(inventory_groups.router, prefix="/api", tags=["inventory-groups"])
 app.include_router(ledger_transactions.router, prefix="/api", tags=["ledger-transactions"])
+app.include_router(exports.router, prefix="/api", tags=["exports"])
+app.include_router(summaries.router, prefix="/api", tags=["summaries"])
+app.include_router(sync.router, prefix="/api", tags=["sync"])
+
+@app.on_event("startup")
+async def warm_up_database_connections():
+    # Pay for DSN resolution and driver loading before the first CRM request does
+    await db_executor.run(db_pool.warm_up)
+    db_pool.start_keepalive()
+
+@app.on_event("shutdown")
+async def close_database_connections():
+    db_pool.stop_keepalive()
+    db_executor.shutdown()
+    db_pool.close_all()
 
 @app.get("/")
 async def root():
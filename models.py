@@ -12,6 +12,13 @@ class PaginationMetadata(BaseModel):
     has_more: bool
     timestamp: datetime
 
+class SyncMetadata(BaseModel):
+    page_size: int
+    since: Optional[str] = None
+    high_water_mark: str
+    has_more: bool
+    timestamp: datetime
+
 # Invoice (HistoryHeader) models
 class Invoice(BaseModel):
     # Primary key fields
@@ -348,6 +355,10 @@ class CustomerMasterResponse(BaseModel):
     data: List[CustomerMaster]
     metadata: PaginationMetadata
 
+class CustomerMasterSyncResponse(BaseModel):
+    data: List[CustomerMaster]
+    metadata: SyncMetadata
+
 class CustomerQuery(BaseModel):
     cursor: Optional[str] = None
     limit: int = 50  # Default to 50, max will be enforced in endpoint
@@ -427,6 +438,10 @@ class InventoryResponse(BaseModel):
     data: List[Inventory]
     metadata: PaginationMetadata
 
+class InventorySyncResponse(BaseModel):
+    data: List[Inventory]
+    metadata: SyncMetadata
+
 class InventoryQuery(BaseModel):
     cursor: Optional[str] = None
     limit: int = 50
@@ -0,0 +1,184 @@
+"""JSON response classes - selected with the JSON_RENDERER setting"""
+from fastapi import Header, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from config import settings
+from datetime import date
+from decimal import Decimal
+import json
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, Union, get_args, get_origin
+
+try:
+    import orjson
+except ImportError:  # Optional - plain content falls back to the json module
+    orjson = None
+
+@lru_cache(maxsize=None)
+def _float_fields(model):
+    """attrgetter for the model's float fields, or None if it has none"""
+    names = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next((arg for arg in get_args(annotation) if arg is not type(None)), None)
+        if annotation is float:
+            names.append(name)
+    if not names:
+        return None
+    getter = attrgetter(*names)
+    return getter if len(names) > 1 else lambda item: (getter(item),)
+
+def _same_float_text(items):
+    """True if every float renders the same in pydantic's serializer and Python's json
+    
+    Both print the shortest round-trip digits, but pydantic writes 0.00001 and
+    1e16 where json writes 1e-05 and 1e+16, and turns NaN into null where
+    FastAPI's json.dumps raises.
+    """
+    if not items:
+        return True
+    getter = _float_fields(type(items[0]))
+    if getter is None:
+        return True
+    for item in items:
+        for value in getter(item):
+            if value is not None and value != 0 and not 1e-4 <= abs(value) < 1e16:
+                return False
+    return True
+
+def _json_default(value):
+    """orjson hook for types it can't encode natively"""
+    if isinstance(value, Decimal):
+        return str(value)  # Same as pydantic's JSON mode - money keeps its exact digits
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class CompatibleResponse(JSONResponse):
+    """JSON response byte-identical to FastAPI's default encoding
+    
+    Returning a page model from the handler makes FastAPI validate it against
+    response_model again and serialise it through Python's json module. Models
+    whose rows were validated by a RowMapper are rendered with pydantic's
+    serializer in the DB worker thread instead; pages holding floats that
+    would print differently use FastAPI's own encoding. Keep response_model
+    on the route so the OpenAPI schema is unchanged. include restricts the
+    fields rendered, as in model_dump (fields= projections).
+    """
+    
+    def __init__(self, content, status_code=200, headers=None, media_type=None, background=None, include=None):
+        # Explicit parameters - FastAPI reads the default status_code from this signature
+        self.include = include
+        super().__init__(content, status_code, headers, media_type, background)
+    
+    def render(self, content) -> bytes:
+        if not isinstance(content, BaseModel):
+            return super().render(content)
+        items = getattr(content, "data", None)
+        if _same_float_text([content] if items is None else items):
+            return content.model_dump_json(by_alias=True, include=self.include).encode("utf-8")
+        return super().render(content.model_dump(mode="json", by_alias=True, include=self.include))
+
+class FastResponse(JSONResponse):
+    """JSON response encoded entirely outside the json module
+    
+    Models go straight through pydantic's serializer and anything else
+    through orjson. Dates and datetimes are ISO 8601, Decimal is a string and
+    NaN/Infinity become null instead of failing the request. Small and large
+    floats are written without the json module's exponent padding (0.00001
+    rather than 1e-05) - the same numbers to any JSON parser.
+    """
+    
+    def __init__(self, content, status_code=200, headers=None, media_type=None, background=None, include=None):
+        self.include = include
+        super().__init__(content, status_code, headers, media_type, background)
+    
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(by_alias=True, include=self.include).encode("utf-8")
+        if orjson is not None:
+            return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+RESPONSE_CLASSES = {
+    "fast": FastResponse,
+    "compatible": CompatibleResponse,
+}
+
+if settings.json_renderer not in RESPONSE_CLASSES:
+    raise ValueError(f"JSON_RENDERER must be one of {', '.join(RESPONSE_CLASSES)}, not {settings.json_renderer!r}")
+
+# The class list handlers wrap their page in, and the app's default for every other route
+ModelResponse = RESPONSE_CLASSES[settings.json_renderer]
+
+@lru_cache(maxsize=None)
+def _row_values(model, names):
+    """attrgetter returning a tuple of the named fields, even for one name"""
+    getter = attrgetter(*names)
+    return getter if len(names) > 1 else lambda item: (getter(item),)
+
+def _compact_default(value):
+    """json module hook for the values orjson encodes natively"""
+    if isinstance(value, date):
+        return value.isoformat()
+    return _json_default(value)
+
+class CompactPageResponse(JSONResponse):
+    """List page as a columns array plus one array of values per row
+    
+    {"columns": [...], "rows": [[...], ...], "metadata": {...}} - the field
+    names are sent once instead of once per row. With sparse=True each row is
+    [presence, values...]: presence is a hex bitmap (bit i of byte i // 8 set
+    when column i has a value) and only the non-null values follow, in column
+    order. Values are encoded as in the object format.
+    """
+    
+    def __init__(self, content, status_code=200, headers=None, media_type=None, background=None, include=None, sparse=False):
+        self.include = include
+        self.sparse = sparse
+        super().__init__(content, status_code, headers, media_type, background)
+    
+    def render(self, content) -> bytes:
+        model = get_args(type(content).model_fields["data"].annotation)[0]
+        names = tuple(model.model_fields)
+        if self.include is not None:
+            selected = self.include["data"]["__all__"]
+            names = tuple(name for name in names if name in selected)
+        rows = list(map(_row_values(model, names), content.data))
+        if self.sparse:
+            rows = [self._sparse_row(values, (len(names) + 7) // 8) for values in rows]
+        body = {"columns": names, "rows": rows, "metadata": content.metadata.model_dump(mode="json")}
+        if orjson is not None:
+            return orjson.dumps(body, default=_json_default)
+        return json.dumps(body, default=_compact_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    
+    @staticmethod
+    def _sparse_row(values, width):
+        bits = 0
+        row = [None]
+        for index, value in enumerate(values):
+            if value is not None:
+                bits |= 1 << index
+                row.append(value)
+        row[0] = bits.to_bytes(width, "little").hex()
+        return row
+
+PAGE_FORMATS = ("objects", "compact", "sparse")
+
+def requested_page_format(
+    page_format: Optional[str] = Query(None, alias="format", description="Page shape: objects (default), compact or sparse"),
+    x_page_format: Optional[str] = Header(None, description="Same as format=, for clients that can't add query parameters")
+):
+    """List endpoint dependency: the page shape asked for by ?format= or X-Page-Format"""
+    value = (page_format or x_page_format or "objects").lower()
+    if value not in PAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown page format {value!r} (use one of: {', '.join(PAGE_FORMATS)})")
+    return value
+
+def page_response(page, include=None, page_format="objects"):
+    """Response for a list page in the requested shape"""
+    if page_format == "objects":
+        return ModelResponse(page, include=include)
+    response = CompactPageResponse(page, include=include, sparse=page_format == "sparse")
+    response.headers["X-Page-Format"] = page_format
+    return response
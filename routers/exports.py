@@ -0,0 +1,90 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from database import db_pool, Priority, DatabaseUnavailableError, QueryTimeoutError
+import logging
+from tables import TABLES
+from streaming import export_body, encode_ndjson, encode_csv
+from functools import partial
+import columnar
+
+# Define the router
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def export_table(table_name, request, options=()):
+    """Registered table and parsed filters for an export request (options are non-filter query parameters)"""
+    table = TABLES.get(table_name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table '{table_name}' (available: {', '.join(TABLES)})")
+    try:
+        filters = table.parse_filters(request.query_params, ignore=options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return table, filters
+
+async def stream_export(table, filters, request, encode, export_format, media_type):
+    """Run encode(table, batches) over the table's rows on one connection and stream its (bytes, rows) chunks"""
+    logger.info(f"Export request: table={table.name}, format={export_format}, filters={filters}")
+    
+    def encode_rows(conn):
+        # Encoded in the DB worker thread
+        yield from encode(table, table.iter_batches(conn, filters))
+    
+    try:
+        chunks = await db_pool.stream(encode_rows, priority=Priority.LOW)
+    except (DatabaseUnavailableError, QueryTimeoutError):
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting {table.name} as {export_format}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to export {table.name}: {str(e)}")
+    
+    return StreamingResponse(
+        export_body(chunks, request.client.host, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table.name}.{export_format}"'}
+    )
+
+@router.get("/export/{table_name}.ndjson")
+async def export_ndjson(table_name: str, request: Request):
+    """Stream every matching row as newline-delimited JSON, in key order
+    
+    Takes the same filters as the table's list endpoint. One query on one
+    connection replaces paging through the table with TOP n queries.
+    """
+    table, filters = export_table(table_name, request)
+    return await stream_export(table, filters, request, encode_ndjson, "ndjson", "application/x-ndjson")
+
+def require_pyarrow():
+    if columnar.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Columnar exports need pyarrow installed on the bridge")
+
+@router.get("/export/{table_name}.arrows")
+async def export_arrow(table_name: str, request: Request):
+    """Stream every matching row as an Arrow IPC stream, one record batch per fetch batch"""
+    require_pyarrow()
+    table, filters = export_table(table_name, request)
+    return await stream_export(table, filters, request, columnar.encode_arrow_stream, "arrows", "application/vnd.apache.arrow.stream")
+
+@router.get("/export/{table_name}.parquet")
+async def export_parquet(table_name: str, request: Request):
+    """Stream every matching row as a Parquet file with per-row-group statistics"""
+    require_pyarrow()
+    table, filters = export_table(table_name, request)
+    return await stream_export(table, filters, request, columnar.encode_parquet, "parquet", "application/vnd.apache.parquet")
+
+# Delimiters accepted from ?delimiter= ("tab" because a literal tab is awkward in a URL)
+CSV_DELIMITERS = {",": ",", ";": ";", "|": "|", "tab": "\t", "\t": "\t"}
+
+@router.get("/export/{table_name}.csv")
+async def export_csv(table_name: str, request: Request):
+    """Stream every matching row as CSV with a header row, in key order
+    
+    Takes the same filters as the table's list endpoint, plus an optional
+    delimiter (",", ";", "|" or "tab").
+    """
+    table, filters = export_table(table_name, request, options=("delimiter",))
+    delimiter = request.query_params.get("delimiter")
+    if delimiter is not None and delimiter not in CSV_DELIMITERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported delimiter {delimiter!r} (use one of: , ; | tab)")
+    encode = partial(encode_csv, delimiter=CSV_DELIMITERS.get(delimiter))
+    return await stream_export(table, filters, request, encode, "csv", "text/csv")
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from database import db_pool
+from database import db_pool, Priority, priority_for_dates, DatabaseUnavailableError, QueryTimeoutError
 from config import settings
 import logging
 from models import HistoryLine, HistoryLineResponse, PaginationMetadata
+from tables import HISTORY_LINES
+from responses import ModelResponse, page_response, requested_page_format
 from datetime import datetime, date
-import base64
-import re
 
 # Define the router
 router = APIRouter()
@@ -21,141 +21,48 @@ async def get_history_lines(
     document_type: Optional[int] = Query(None, description="Filter by document type"),
     document_number: Optional[str] = Query(None, description="Filter by document number"),
     customer_code: Optional[str] = Query(None, description="Filter by customer code"),
-    item_code: Optional[str] = Query(None, description="Filter by item code")
+    item_code: Optional[str] = Query(None, description="Filter by item code"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (keys are always included)"),
+    page_format: str = Depends(requested_page_format)
 ):
     """Get a paginated list of history lines"""
     logger.info(f"History lines request: cursor={cursor}, limit={limit}, from_date={from_date}, to_date={to_date}, document_type={document_type}, document_number={document_number}, customer_code={customer_code}, item_code={item_code}")
     
+    projection = HISTORY_LINES.projection(fields)
+    
+    def run_query(conn):
+        history_lines, has_more, truncated, next_cursor = HISTORY_LINES.list_page(conn, limit, cursor, {
+            "from_date": from_date,
+            "to_date": to_date,
+            "document_type": document_type,
+            "document_number": document_number,
+            "customer_code": customer_code,
+            "item_code": item_code
+        }, projection=projection)
+        logger.info(f"Retrieved {len(history_lines)} history lines")
+        
+        # Build response
+        metadata = PaginationMetadata(
+            page_size=limit,
+            cursor=cursor,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            timestamp=datetime.now()
+        )
+        
+        # Rows are validated already - render without FastAPI re-validating the page
+        page = page_response(HistoryLineResponse(data=history_lines, metadata=metadata), projection.page_include, page_format)
+        if truncated:
+            page.headers["X-Page-Truncated"] = "true"
+        return page
+    
     try:
-        with db_pool.get_connection() as conn:
-            cursor_obj = conn.cursor()
-            
-            # Build the field list - MUST match exact database column names
-            fields = [
-                "UserId", "DocumentType", "DocumentNumber", "ItemCode",
-                "CustomerCode", "SalesmanCode", "SearchType", "PPeriod",
-                "DDate", "UnitUsed", "TaxType", "DiscountType",
-                "DiscountPercentage", "Description", "CostPrice", "Qty",
-                "UnitPrice", "InclusivePrice", "FCurrUnitPrice", "FCurrInclPrice",
-                "TaxAmt", "FCurrTaxAmount", "DiscountAmount", "FCDiscountAmount",
-                "CostCode", "DateTime", "Physical", "Fixed", "ShowQty",
-                "LinkNum", "LinkedNum", "GRNQty", "LinkID", "MultiStore",
-                "IsTMBLine", "LinkDocumentType", "LinkDocumentNumber",
-                "Exported", "ExportRef", "ExportNum", "QtyLeft",
-                "CaseLotCode", "CaseLotQty", "CaseLotRatio", "CostSyncDone"
-            ]
-            
-            # Build query - single line to avoid ODBC truncation issues
-            field_list = ", ".join(fields)
-            query = f"SELECT TOP {limit + 1} {field_list} FROM HistoryLines WHERE 1=1"
-            params = []
-            
-            # Add filters
-            if from_date:
-                query += " AND DDate >= ?"
-                params.append(from_date)
-            
-            if to_date:
-                query += " AND DDate <= ?"
-                params.append(to_date)
-            
-            if document_type is not None:
-                query += " AND DocumentType = ?"
-                params.append(document_type)
-            
-            if document_number:
-                query += " AND DocumentNumber = ?"
-                params.append(document_number)
-            
-            if customer_code:
-                query += " AND CustomerCode = ?"
-                params.append(customer_code)
-            
-            if item_code:
-                query += " AND ItemCode = ?"
-                params.append(item_code)
-            
-            # Add cursor for pagination
-            if cursor:
-                decoded_cursor = base64.b64decode(cursor).decode('utf-8')
-                # Decode as DocumentType:DocumentNumber:LinkNum
-                parts = decoded_cursor.split(':', 2)
-                if len(parts) == 3:
-                    query += " AND (DocumentType > ? OR (DocumentType = ? AND DocumentNumber > ?) OR (DocumentType = ? AND DocumentNumber = ? AND LinkNum > ?))"
-                    params.extend([int(parts[0]), int(parts[0]), parts[1], int(parts[0]), parts[1], int(parts[2])])
-            
-            # Order by primary keys
-            query += " ORDER BY DocumentType, DocumentNumber, LinkNum"
-            
-            logger.debug(f"Executing query with {len(params)} parameters")
-            cursor_obj.execute(query, params)
-            
-            history_lines = []
-            rows = cursor_obj.fetchall()
-            
-            # Process up to limit rows
-            for i, row in enumerate(rows[:limit]):
-                line_data = {}
-                for j, field in enumerate(fields):
-                    # Convert field name to snake_case for the model
-                    s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', field)
-                    s2 = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', s1)
-                    s3 = re.sub(r'([a-zA-Z])(\d)', r'\1_\2', s2)
-                    snake_case_field = s3.lower()
-                    value = row[j]
-                    
-                    # Handle different data types
-                    if field == 'DDate' and value:
-                        # Date field handling
-                        if isinstance(value, str):
-                            try:
-                                if '/' in value:
-                                    line_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y').date()
-                                else:
-                                    line_data[snake_case_field] = datetime.fromisoformat(value).date()
-                            except:
-                                line_data[snake_case_field] = None
-                        else:
-                            line_data[snake_case_field] = value
-                    elif field == 'DateTime' and value:
-                        # DateTime field handling
-                        if isinstance(value, str):
-                            try:
-                                line_data[snake_case_field] = datetime.fromisoformat(value)
-                            except:
-                                line_data[snake_case_field] = None
-                        else:
-                            line_data[snake_case_field] = value
-                    elif isinstance(value, str):
-                        # Trim string values
-                        line_data[snake_case_field] = value.strip()
-                    else:
-                        line_data[snake_case_field] = value
-                
-                history_lines.append(HistoryLine(**line_data))
-            
-            # Determine if there are more results
-            has_more = len(rows) > limit
-            next_cursor = None
-            if has_more and history_lines:
-                # Use composite cursor: DocumentType:DocumentNumber:LinkNum
-                last_line = history_lines[-1]
-                cursor_value = f"{last_line.document_type}:{last_line.document_number}:{last_line.link_num}"
-                next_cursor = base64.b64encode(cursor_value.encode('utf-8')).decode('utf-8')
-            
-            logger.info(f"Retrieved {len(history_lines)} history lines")
-            
-            # Build response
-            metadata = PaginationMetadata(
-                page_size=limit,
-                cursor=cursor,
-                next_cursor=next_cursor,
-                has_more=has_more,
-                timestamp=datetime.now()
-            )
-            
-            return HistoryLineResponse(data=history_lines, metadata=metadata)
+        # Lookups of one document are targeted; otherwise the date range decides
+        priority = Priority.MEDIUM if document_number else priority_for_dates(from_date, to_date)
+        return await db_pool.run(run_query, priority=priority)
             
+    except (DatabaseUnavailableError, QueryTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Error fetching history lines: {e}")
         logger.error(f"Query parameters: cursor={cursor}, limit={limit}, from_date={from_date}, to_date={to_date}, document_type={document_type}, document_number={document_number}")
@@ -163,81 +70,29 @@ async def get_history_lines(
 
 # Single history line endpoint
 @router.get("/history-lines/{document_type}/{document_number}/{link_num}", response_model=HistoryLine)
-async def get_history_line(document_type: int, document_number: str, link_num: int):
+async def get_history_line(document_type: int, document_number: str, link_num: int, fields: Optional[str] = Query(None, description="Comma-separated fields to return (keys are always included)")):
     """Get a single history line by document type, number and link number"""
     logger.info(f"History line detail request: document_type={document_type}, document_number={document_number}, link_num={link_num}")
     
+    projection = HISTORY_LINES.projection(fields)
+    
+    def run_query(conn):
+        history_line = HISTORY_LINES.get(conn, document_type, document_number, link_num, projection=projection)
+        
+        if history_line is None:
+            raise HTTPException(status_code=404, detail=f"History line not found: {document_type}/{document_number}/{link_num}")
+        
+        logger.info(f"Retrieved history line: {document_type}/{document_number}/{link_num}")
+        
+        return ModelResponse(history_line, include=projection.include)
+    
     try:
-        with db_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get all fields
-            fields = [
-                "UserId", "DocumentType", "DocumentNumber", "ItemCode",
-                "CustomerCode", "SalesmanCode", "SearchType", "PPeriod",
-                "DDate", "UnitUsed", "TaxType", "DiscountType",
-                "DiscountPercentage", "Description", "CostPrice", "Qty",
-                "UnitPrice", "InclusivePrice", "FCurrUnitPrice", "FCurrInclPrice",
-                "TaxAmt", "FCurrTaxAmount", "DiscountAmount", "FCDiscountAmount",
-                "CostCode", "DateTime", "Physical", "Fixed", "ShowQty",
-                "LinkNum", "LinkedNum", "GRNQty", "LinkID", "MultiStore",
-                "IsTMBLine", "LinkDocumentType", "LinkDocumentNumber",
-                "Exported", "ExportRef", "ExportNum", "QtyLeft",
-                "CaseLotCode", "CaseLotQty", "CaseLotRatio", "CostSyncDone"
-            ]
-            
-            # Single line query to avoid ODBC truncation
-            field_list = ", ".join(fields)
-            query = f"SELECT {field_list} FROM HistoryLines WHERE DocumentType = ? AND DocumentNumber = ? AND LinkNum = ?"
-            
-            cursor.execute(query, [document_type, document_number, link_num])
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"History line not found: {document_type}/{document_number}/{link_num}")
-            
-            # Build history line object
-            line_data = {}
-            for j, field in enumerate(fields):
-                # Convert field name to snake_case
-                s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', field)
-                s2 = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', s1)
-                s3 = re.sub(r'([a-zA-Z])(\d)', r'\1_\2', s2)
-                snake_case_field = s3.lower()
-                value = row[j]
-                
-                # Handle data types
-                if field == 'DDate' and value:
-                    if isinstance(value, str):
-                        try:
-                            if '/' in value:
-                                line_data[snake_case_field] = datetime.strptime(value, '%d/%m/%Y').date()
-                            else:
-                                line_data[snake_case_field] = datetime.fromisoformat(value).date()
-                        except:
-                            line_data[snake_case_field] = None
-                    else:
-                        line_data[snake_case_field] = value
-                elif field == 'DateTime' and value:
-                    if isinstance(value, str):
-                        try:
-                            line_data[snake_case_field] = datetime.fromisoformat(value)
-                        except:
-                            line_data[snake_case_field] = None
-                    else:
-                        line_data[snake_case_field] = value
-                elif isinstance(value, str):
-                    line_data[snake_case_field] = value.strip()
-                else:
-                    line_data[snake_case_field] = value
-            
-            history_line = HistoryLine(**line_data)
-            logger.info(f"Retrieved history line: {document_type}/{document_number}/{link_num}")
-            
-            return history_line
+        return await db_pool.run(run_query)
             
     except HTTPException:
         raise
+    except (DatabaseUnavailableError, QueryTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Error fetching history line {document_type}/{document_number}/{link_num}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch history line: {str(e)}")
@@ -250,7 +105,9 @@ async def get_invoice_lines(
     cursor: Optional[str] = Query(None, description="Cursor for pagination"),
     limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
     from_date: Optional[date] = Query(None, description="Filter by start date"),
-    to_date: Optional[date] = Query(None, description="Filter by end date")
+    to_date: Optional[date] = Query(None, description="Filter by end date"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (keys are always included)"),
+    page_format: str = Depends(requested_page_format)
 ):
     """Get all history lines for a specific invoice"""
     logger.info(f"Invoice lines request: document_type={document_type}, document_number={document_number}, cursor={cursor}, limit={limit}, from_date={from_date}, to_date={to_date}")
@@ -264,5 +121,7 @@ async def get_invoice_lines(
         document_type=document_type,
         document_number=document_number,
         customer_code=None,
-        item_code=None
+        item_code=None,
+        fields=fields,
+        page_format=page_format
     ) 
\ No newline at end of file
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, Request
+from database import db_pool, Priority, DatabaseUnavailableError, QueryTimeoutError
+from config import settings
+import logging
+from datetime import datetime
+import aggregates
+
+# Define the router
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Query parameters that are not table filters
+OPTIONS = ("group_by", "nonzero")
+
+@router.get("/summary/{table_name}")
+async def get_summary(table_name: str, request: Request):
+    """Totals of a table's measures, optionally grouped, over every row matching the list filters
+    
+    group_by takes comma-separated field names (e.g. acc_number,p_period);
+    without it one grand total is returned. nonzero=true leaves out groups
+    whose totals are all zero. Takes the same filters as the table's list
+    endpoint.
+    """
+    if aggregates.numpy is None:
+        raise HTTPException(status_code=501, detail="Summaries need numpy installed on the bridge")
+    summary = aggregates.SUMMARIES.get(table_name)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No summary for '{table_name}' (available: {', '.join(aggregates.SUMMARIES)})")
+    try:
+        by = summary.parse_group_by(request.query_params.get("group_by"))
+        filters = summary.table.parse_filters(request.query_params, ignore=OPTIONS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    nonzero = request.query_params.get("nonzero", "").lower() in ("1", "true", "yes")
+    logger.info(f"Summary request: table={table_name}, group_by={by}, filters={filters}, nonzero={nonzero}")
+    
+    def run_query(conn):
+        columns, _ = summary.layout(by)
+        batches = summary.table.iter_rows(conn, columns, filters, batch_size=settings.summary_fetch_batch_size)
+        totals, rows_read = summary.totals(batches, by)
+        if nonzero:
+            measures = summary.measure_names()
+            mask = aggregates.numpy.zeros(len(totals), dtype=bool)
+            for name in measures:
+                mask |= totals[name] != 0
+            totals = totals.filter(mask)
+        logger.info(f"Summarised {rows_read} {table_name} rows into {len(totals)} groups")
+        return {
+            "group_by": by,
+            "measures": summary.measure_names(),
+            "groups": totals.to_records(),
+            "metadata": {
+                "rows": rows_read,
+                "groups": len(totals),
+                "timestamp": datetime.now()
+            }
+        }
+    
+    try:
+        # A full scan of the matching rows - yields to interactive requests, and
+        # gets its own deadline rather than the one sized for single pages
+        return await db_pool.run(run_query, priority=Priority.LOW, timeout=settings.summary_deadline_seconds)
+    
+    except (DatabaseUnavailableError, QueryTimeoutError):
+        raise
+    except Exception as e:
+        logger.error(f"Error summarising {table_name}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to summarise {table_name}: {str(e)}")
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, Union
+from database import db_pool, DatabaseUnavailableError, QueryTimeoutError
+from config import settings
+import logging
+from models import CustomerMasterSyncResponse, InventorySyncResponse, SyncMetadata
+from tables import CUSTOMERS, INVENTORY
+from responses import page_response, requested_page_format
+from datetime import datetime
+
+# Define the router
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Tables with an UpdatedOn column, and the page model for each
+SYNC_TABLES = {
+    CUSTOMERS.name: (CUSTOMERS, CustomerMasterSyncResponse),
+    INVENTORY.name: (INVENTORY, InventorySyncResponse),
+}
+
+@router.get("/sync/{table_name}", response_model=Union[CustomerMasterSyncResponse, InventorySyncResponse])
+async def get_changes(
+    table_name: str,
+    since: Optional[str] = Query(None, description="High-water mark from the previous page or run, or an ISO date; omit for a full sync"),
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (keys and UpdatedOn are always included)"),
+    page_format: str = Depends(requested_page_format)
+):
+    """Rows changed since the last sync, ordered by (UpdatedOn, key)
+    
+    Pass metadata.high_water_mark back as since until has_more is false, then
+    store the last one for the next run. Rows updated at the stored mark's
+    date/time are sent again, so upsert by key.
+    """
+    if table_name not in SYNC_TABLES:
+        raise HTTPException(status_code=404, detail=f"No sync for '{table_name}' (available: {', '.join(SYNC_TABLES)})")
+    table, page_model = SYNC_TABLES[table_name]
+    logger.info(f"Sync request: table={table_name}, since={since}, limit={limit}")
+    
+    # The high-water mark is read from UpdatedOn, so it is always selected
+    projection = table.projection(f"{fields},{table.updated}" if fields else None)
+    try:
+        # Malformed tokens are rejected before a connection is taken
+        if since:
+            table.sync_condition(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def run_query(conn):
+        items, has_more, truncated, high_water_mark = table.sync_page(conn, limit, since, projection=projection)
+        logger.info(f"Retrieved {len(items)} changed {table_name} rows")
+        
+        metadata = SyncMetadata(
+            page_size=limit,
+            since=since,
+            high_water_mark=high_water_mark,
+            has_more=has_more,
+            timestamp=datetime.now()
+        )
+        
+        page = page_response(page_model(data=items, metadata=metadata), projection.page_include, page_format)
+        if truncated:
+            page.headers["X-Page-Truncated"] = "true"
+        return page
+    
+    try:
+        return await db_pool.run(run_query)
+    
+    except (DatabaseUnavailableError, QueryTimeoutError):
+        raise
+    except Exception as e:
+        logger.error(f"Error syncing {table_name} since {since}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to sync {table_name}: {str(e)}")
@@ -0,0 +1,152 @@
+"""Bulk export plumbing: per-client row budgets, export counters and text encoders"""
+from config import settings
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Union, get_args, get_origin
+import asyncio
+import csv
+import io
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class RowBudget:
+    """Per-client token bucket charged by exported rows rather than requests
+    
+    A full bucket holds one minute of rows. Exports that run ahead of the
+    budget are slowed down, not rejected - the debt is slept off before the
+    next batch is sent, so a client's combined exports average out at
+    export_rows_per_minute.
+    """
+    
+    def __init__(self, rows_per_minute):
+        self.rows_per_minute = rows_per_minute
+        # client -> (tokens, updated_at); only touched from the event loop
+        self._buckets = {}
+        
+        # Counters exposed through /api/metrics
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+    
+    async def consume(self, client, rows):
+        if not self.rows_per_minute:
+            return
+        rate = self.rows_per_minute / 60
+        now = time.time()
+        tokens, updated_at = self._buckets.get(client, (self.rows_per_minute, now))
+        tokens = min(self.rows_per_minute, tokens + (now - updated_at) * rate) - rows
+        self._buckets[client] = (tokens, now)
+        if tokens < 0:
+            wait = -tokens / rate
+            self.throttled += 1
+            self.throttled_seconds += wait
+            await asyncio.sleep(wait)
+    
+    def stats(self):
+        return {
+            "rows_per_minute": self.rows_per_minute,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 2)
+        }
+
+row_budget = RowBudget(settings.export_rows_per_minute)
+
+class ExportStats:
+    """Export counters, keyed by format"""
+    
+    def __init__(self):
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self.aborted = 0
+        self.rows = {}
+        self.bytes = {}
+    
+    def stats(self):
+        return {
+            "active": self.active,
+            "started": self.started,
+            "completed": self.completed,
+            "aborted": self.aborted,
+            "rows": dict(self.rows),
+            "bytes": dict(self.bytes),
+            "budget": row_budget.stats()
+        }
+
+export_stats = ExportStats()
+
+def encode_ndjson(table, batches):
+    """Newline-delimited JSON: yields (bytes, rows), one fetch batch per chunk"""
+    serializer = table.model.__pydantic_serializer__
+    for batch in batches:
+        lines = [serializer.to_json(item, by_alias=True) for item in batch]
+        lines.append(b"")
+        yield b"\n".join(lines), len(batch)
+
+async def export_body(chunks, client, export_format):
+    """Response body for an export: (data, rows) chunks from DatabasePool.stream, charged to the client's row budget"""
+    export_stats.active += 1
+    export_stats.started += 1
+    rows_sent = 0
+    completed = False
+    try:
+        async for data, rows in chunks:
+            await row_budget.consume(client, rows)
+            rows_sent += rows
+            export_stats.rows[export_format] = export_stats.rows.get(export_format, 0) + rows
+            export_stats.bytes[export_format] = export_stats.bytes.get(export_format, 0) + len(data)
+            yield data
+        completed = True
+    finally:
+        export_stats.active -= 1
+        if completed:
+            export_stats.completed += 1
+            logger.info(f"Export ({export_format}) to {client} finished after {rows_sent} rows")
+        else:
+            export_stats.aborted += 1
+            logger.warning(f"Export ({export_format}) to {client} stopped after {rows_sent} rows")
+        # Release the connection promptly rather than when the generator is collected
+        await chunks.aclose()
+
+def encode_csv(table, batches, delimiter=None):
+    """CSV with a header row: yields (bytes, rows), one fetch batch per chunk
+    
+    Dates use export_csv_date_format (Pastel's DD/MM/YYYY by default) and
+    timestamps the same format plus the time; None is an empty cell.
+    """
+    fields = table.model.model_fields
+    names = list(fields)
+    row_of = attrgetter(*names)
+    
+    # Only date columns need per-cell work - csv writes numbers, text and None itself
+    date_format = settings.export_csv_date_format
+    date_columns = []
+    for index, field in enumerate(fields.values()):
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next((arg for arg in get_args(annotation) if arg is not type(None)), None)
+        if annotation is datetime:
+            date_columns.append((index, f"{date_format} %H:%M:%S"))
+        elif annotation is date:
+            date_columns.append((index, date_format))
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter or settings.export_csv_delimiter, lineterminator="\r\n")
+    writer.writerow(names)
+    
+    for batch in batches:
+        for item in batch:
+            values = list(row_of(item))
+            for index, pattern in date_columns:
+                value = values[index]
+                if value is not None:
+                    values[index] = value.strftime(pattern)
+            writer.writerow(values)
+        # The header goes out with the first batch, so SQL errors still surface before the response starts
+        yield buffer.getvalue().encode("utf-8"), len(batch)
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # No rows - just the header
+        yield buffer.getvalue().encode("utf-8"), 0
@@ -0,0 +1,579 @@
+"""Declarative registry of the Pastel tables the API exposes
+
+Each Table declares its columns, key columns (which double as the ORDER BY and
+the pagination cursor layout), optional list filters and per-column
+converters. SQL, row mapping and cursor handling are generated from that, so
+list and detail handlers in the routers only deal with HTTP.
+"""
+from database import execute_cached, fetch_page, iter_batches
+from mappers import RowMapper, strip_value, int_or_strip_value
+from dates import date_value, datetime_value, iso_datetime_value
+from models import CustomerMaster, DeliveryAddress, HistoryLine, Inventory, InventoryCategory, InventoryGroup, Invoice, LedgerTransaction
+from datetime import date, datetime
+import base64
+import binascii
+
+class Filter:
+    """An optional list filter: query parameter -> condition on one column"""
+    
+    def __init__(self, param, column, op="=", transform=None, parse=str):
+        self.param = param
+        self.column = column
+        self.condition = f"{column} {op} ?"
+        self.transform = transform
+        # Converts raw query string values where there is no typed Query() parameter (exports)
+        self.parse = parse
+    
+    def applies(self, value):
+        # Empty strings are treated as "not given", but 0 is a real filter value
+        return value is not None and value != ""
+
+class InvalidFieldsError(ValueError):
+    """fields= named something the table doesn't have (answered with 400)"""
+
+class Projection:
+    """The columns one fields= selection reads: SELECT list, mapper and rendered fields"""
+    
+    def __init__(self, table, columns, mapper, include=None):
+        self.columns = columns
+        self.mapper = mapper
+        # Model fields to render, or None for all of them
+        self.include = include
+        self.page_include = None if include is None else {"data": {"__all__": include}, "metadata": True}
+        # Part of the statement cache key - None for the full column list
+        self.key = None if include is None else tuple(columns)
+        self.field_list = ", ".join(columns)
+        self.detail_query = f"SELECT {self.field_list} FROM {table.source} WHERE " + " AND ".join(f"{column} = ?" for column in table.keys)
+
+# Layout of sortable_timestamp() values, for turning an ISO since into one
+SYNC_KEY_FORMAT = "%Y%m%d %H:%M:%S"
+
+def sortable_timestamp(column):
+    """SQL rearranging a DD/MM/YYYY HH:MM:SS text column to sort chronologically
+    
+    Pastel keeps UpdatedOn as text in that layout, so neither ORDER BY nor
+    comparisons on the raw column follow time. This gives "YYYYMMDD HH:MM:SS",
+    or "" where the column is NULL, so undated rows sort first.
+    """
+    return (
+        f"COALESCE(CONCAT(CONCAT(SUBSTRING({column}, 7, 4), SUBSTRING({column}, 4, 2)), "
+        f"CONCAT(SUBSTRING({column}, 1, 2), SUBSTRING({column}, 11, 9))), '')"
+    )
+
+class Table:
+    """One Pastel table: columns, keys, filters and converters"""
+    
+    def __init__(self, name, source, model, columns, keys, filters=(), converters=None, default=None, codes=(), updated=None):
+        self.name = name
+        self.source = source
+        self.model = model
+        self.columns = list(columns)
+        # Low-cardinality code columns (interned by the mapper, dictionary-encoded in columnar exports)
+        self.codes = list(codes)
+        self.mapper = RowMapper(model, self.columns, converters, default, self.codes)
+        self._converters = converters
+        self._default = default
+        
+        # Key columns in sort order, with the type used to decode cursor parts
+        self.keys = [column for column, _ in keys]
+        self.key_types = dict(keys)
+        self.filters = list(filters)
+        self._filters_by_param = {spec.param: spec for spec in self.filters}
+        
+        # Change-tracking column for incremental sync, and the SQL that sorts it chronologically
+        self.updated = updated
+        self.sync_key = sortable_timestamp(updated) if updated else None
+        
+        self._attributes = dict(zip(self.columns, self.mapper.names))
+        # Single line queries - the ODBC driver truncates multi-line SQL
+        self.field_list = ", ".join(self.columns)
+        self.detail_query = f"SELECT {self.field_list} FROM {source} WHERE " + " AND ".join(f"{column} = ?" for column in self.keys)
+        
+        # fields= accepts model attribute names or Pastel column names (any case)
+        self._columns_by_field = {column.lower(): column for column in self.columns}
+        self._columns_by_field.update((name, column) for column, name in self._attributes.items())
+        # Keys (cursors, detail lookups) and fields the model requires are always read
+        required = {name for name, field in model.model_fields.items() if field.is_required()}
+        self._always = {column for column in self.columns if column in self.keys or self._attributes[column] in required}
+        self._full = Projection(self, self.columns, self.mapper)
+        self._projections = {}
+    
+    def projection(self, fields=None):
+        """Projection for a comma-separated fields= value; None or empty selects every column"""
+        if not fields:
+            return self._full
+        wanted = set(self._always)
+        unknown = []
+        for name in fields.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            column = self._columns_by_field.get(name.lower())
+            if column is None:
+                unknown.append(name)
+            else:
+                wanted.add(column)
+        if unknown:
+            raise InvalidFieldsError(f"Unknown field(s) for {self.name}: {', '.join(unknown)}")
+        
+        columns = tuple(column for column in self.columns if column in wanted)
+        if len(columns) == len(self.columns):
+            return self._full
+        projection = self._projections.get(columns)
+        if projection is None:
+            # Clients tend to repeat a handful of selections; bound it anyway
+            if len(self._projections) >= 64:
+                self._projections.clear()
+            mapper = RowMapper(self.model, columns, self._converters, self._default, self.codes)
+            include = {name for name in mapper.names if name in self.model.model_fields}
+            projection = self._projections[columns] = Projection(self, list(columns), mapper, include)
+        return projection
+    
+    def attribute(self, column):
+        """Model attribute name for a column"""
+        return self._attributes[column]
+    
+    def encode_cursor(self, item, keys=None):
+        """Opaque cursor for the row after item: base64 of its key values joined by ':'"""
+        values = [str(getattr(item, self.attribute(column))) for column in keys or self.keys]
+        return base64.b64encode(":".join(values).encode('utf-8')).decode('utf-8')
+    
+    def cursor_condition(self, cursor, keys=None):
+        """(condition, params) selecting rows after the cursor, or None if its layout doesn't match"""
+        keys = keys or self.keys
+        decoded_cursor = base64.b64decode(cursor).decode('utf-8')
+        parts = decoded_cursor.split(':', len(keys) - 1)
+        if len(parts) != len(keys):
+            return None
+        values = [self.key_types[column](part) for column, part in zip(keys, parts)]
+        return self._after(keys, values)
+    
+    def _after(self, keys, values):
+        """(condition, params) selecting rows whose keys sort after values"""
+        # Keyset predicate: (k1 > ?) OR (k1 = ? AND k2 > ?) OR ...
+        terms = []
+        params = []
+        for i, column in enumerate(keys):
+            equal = [f"{key} = ?" for key in keys[:i]]
+            terms.append(" AND ".join(equal + [f"{column} > ?"]))
+            params.extend(values[:i] + [values[i]])
+        if len(terms) == 1:
+            return terms[0], params
+        return "(" + " OR ".join(terms[:1] + [f"({term})" for term in terms[1:]]) + ")", params
+    
+    def encode_sync_token(self, stamp, key_values=None):
+        """Opaque sync position: base64 of "<sync key>|<key values joined by ':'>"
+        
+        stamp is the row's sync_key as read back from the database. Without key
+        values the token is a high-water mark - every row with that sync key or
+        a later one.
+        """
+        text = stamp
+        if key_values is not None:
+            text += "|" + ":".join(str(value) for value in key_values)
+        return base64.b64encode(text.encode('utf-8')).decode('utf-8')
+    
+    def sync_condition(self, since):
+        """(condition, params) for rows after a sync token, or updated at/after an ISO date; ValueError if since is neither"""
+        try:
+            return f"{self.sync_key} >= ?", [datetime.fromisoformat(since).strftime(SYNC_KEY_FORMAT)]
+        except ValueError:
+            pass
+        invalid = ValueError(f"since must be an ISO date or a sync token, not {since!r}")
+        try:
+            stamp, marker, position = base64.b64decode(since, validate=True).decode('utf-8').partition("|")
+            parts = position.split(':', len(self.keys) - 1)
+            values = [self.key_types[column](part) for column, part in zip(self.keys, parts)] if marker else None
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise invalid from None
+        if not marker:
+            return f"{self.sync_key} >= ?", [stamp]
+        if len(parts) != len(self.keys):
+            raise invalid
+        
+        after, params = self._after(self.keys, values)
+        return f"({self.sync_key} > ? OR ({self.sync_key} = ? AND {after}))", [stamp, stamp] + params
+    
+    def parse_filters(self, query_params, ignore=()):
+        """Filter values from raw query parameters; ValueError names anything unknown or malformed"""
+        filters = {}
+        for param, raw in query_params.items():
+            if param in ignore:
+                continue
+            spec = self._filters_by_param.get(param)
+            if spec is None:
+                raise ValueError(f"Unknown filter '{param}' for {self.name} (available: {', '.join(self._filters_by_param) or 'none'})")
+            try:
+                filters[param] = spec.parse(raw) if raw != "" else raw
+            except ValueError:
+                raise ValueError(f"Invalid value for '{param}': {raw!r}") from None
+        return filters
+    
+    def _conditions(self, filters):
+        """WHERE conditions and parameters for the active filters"""
+        conditions = []
+        params = []
+        for spec in self.filters:
+            value = filters.get(spec.param)
+            if spec.applies(value):
+                conditions.append(spec.condition)
+                params.append(spec.transform(value) if spec.transform else value)
+        return conditions, params
+    
+    def list_page(self, conn, limit, cursor=None, filters=None, keys=None, projection=None):
+        """Fetch one page ordered by keys
+        
+        Returns (items, has_more, truncated, next_cursor). keys overrides the
+        cursor layout for scoped listings (e.g. one customer's addresses), and
+        projection limits the columns read (see projection()).
+        """
+        keys = keys or self.keys
+        projection = projection or self._full
+        
+        # Active filters decide the SQL text, so each combination is built once
+        conditions, params = self._conditions(filters or {})
+        
+        if cursor:
+            after = self.cursor_condition(cursor, keys)
+            if after:
+                conditions.append(after[0])
+                params.extend(after[1])
+        
+        def build_query():
+            where = "".join(f" AND {condition}" for condition in conditions)
+            order_by = ", ".join(keys)
+            return f"SELECT TOP {limit + 1} {projection.field_list} FROM {self.source} WHERE 1=1{where} ORDER BY {order_by}"
+        
+        cache_key = (self.source, tuple(keys), limit + 1, tuple(conditions), projection.key)
+        cursor_obj = execute_cached(conn, cache_key, build_query, params)
+        items, has_more, truncated = fetch_page(cursor_obj, limit, projection.mapper)
+        
+        next_cursor = None
+        if has_more and items:
+            next_cursor = self.encode_cursor(items[-1], keys)
+        return items, has_more, truncated, next_cursor
+    
+    def sync_page(self, conn, limit, since=None, projection=None):
+        """Fetch the next page of rows changed since a sync token, ordered by (sync_key, keys)
+        
+        Returns (items, has_more, truncated, high_water_mark). While has_more
+        the mark is the exact position after the last row; on the last page it
+        is the last row's sync key, inclusive, so rows changed later in that
+        same second are not missed on the next run (they may be sent twice).
+        Raises ValueError for a malformed since.
+        """
+        projection = projection or self._full
+        conditions, params = [], []
+        if since:
+            condition, params = self.sync_condition(since)
+            conditions.append(condition)
+        
+        def build_query():
+            where = "".join(f" AND {condition}" for condition in conditions)
+            order_by = ", ".join([self.sync_key] + self.keys)
+            # The sync key rides along after the model's columns, which the mapper ignores
+            return f"SELECT TOP {limit + 1} {projection.field_list}, {self.sync_key} FROM {self.source} WHERE 1=1{where} ORDER BY {order_by}"
+        
+        stamps = []
+        def map_row(row):
+            stamps.append(row[-1])
+            return projection.mapper(row)
+        
+        cache_key = (self.source, "sync", limit + 1, tuple(conditions), projection.key)
+        cursor_obj = execute_cached(conn, cache_key, build_query, params)
+        items, has_more, truncated = fetch_page(cursor_obj, limit, map_row)
+        
+        if not items:
+            high_water_mark = since or self.encode_sync_token("")
+        elif has_more:
+            high_water_mark = self.encode_sync_token(stamps[-1], [getattr(items[-1], self.attribute(column)) for column in self.keys])
+        else:
+            high_water_mark = self.encode_sync_token(stamps[-1])
+        return items, has_more, truncated, high_water_mark
+    
+    def iter_batches(self, conn, filters=None):
+        """Yield every matching row in key order, one fetch batch of models at a time
+        
+        A single forward-only query with no TOP - the driver streams rows as
+        they are fetched, so memory is bounded by fetch_batch_size rather than
+        the table size.
+        """
+        conditions, params = self._conditions(filters or {})
+        
+        def build_query():
+            where = "".join(f" AND {condition}" for condition in conditions)
+            order_by = ", ".join(self.keys)
+            return f"SELECT {self.field_list} FROM {self.source} WHERE 1=1{where} ORDER BY {order_by}"
+        
+        cursor = execute_cached(conn, (self.source, "export", tuple(conditions)), build_query, params)
+        mapper = self.mapper
+        for rows in iter_batches(cursor):
+            yield [mapper(row) for row in rows]
+    
+    def iter_rows(self, conn, columns, filters=None, batch_size=None):
+        """Yield raw fetch batches of just the given columns for every matching row, in no particular order"""
+        conditions, params = self._conditions(filters or {})
+        
+        def build_query():
+            where = "".join(f" AND {condition}" for condition in conditions)
+            return f"SELECT {', '.join(columns)} FROM {self.source} WHERE 1=1{where}"
+        
+        cursor = execute_cached(conn, (self.source, "columns", tuple(columns), tuple(conditions)), build_query, params)
+        yield from iter_batches(cursor, batch_size=batch_size)
+    
+    def get(self, conn, *key_values, projection=None):
+        """Fetch one row by its full key, or None"""
+        projection = projection or self._full
+        cursor = execute_cached(conn, (self.source, "detail", projection.key), lambda: projection.detail_query, list(key_values))
+        row = cursor.fetchone()
+        return projection.mapper(row) if row else None
+
+# Column lists - MUST match exact database column names
+
+CUSTOMER_FIELDS = [
+    "Category", "CustomerCode", "CustomerDesc",
+    # Balance fields - This Year
+    "BalanceThis01", "BalanceThis02", "BalanceThis03", "BalanceThis04", "BalanceThis05",
+    "BalanceThis06", "BalanceThis07", "BalanceThis08", "BalanceThis09", "BalanceThis10",
+    "BalanceThis11", "BalanceThis12", "BalanceThis13",
+    # Balance fields - Last Year
+    "BalanceLast01", "BalanceLast02", "BalanceLast03", "BalanceLast04", "BalanceLast05",
+    "BalanceLast06", "BalanceLast07", "BalanceLast08", "BalanceLast09", "BalanceLast10",
+    "BalanceLast11", "BalanceLast12", "BalanceLast13",
+    # Sales fields - This Year
+    "SalesThis01", "SalesThis02", "SalesThis03", "SalesThis04", "SalesThis05",
+    "SalesThis06", "SalesThis07", "SalesThis08", "SalesThis09", "SalesThis10",
+    "SalesThis11", "SalesThis12", "SalesThis13",
+    # Sales fields - Last Year
+    "SalesLast01", "SalesLast02", "SalesLast03", "SalesLast04", "SalesLast05",
+    "SalesLast06", "SalesLast07", "SalesLast08", "SalesLast09", "SalesLast10",
+    "SalesLast11", "SalesLast12", "SalesLast13",
+    # Address fields
+    "PostAddress01", "PostAddress02", "PostAddress03", "PostAddress04", "PostAddress05",
+    # Financial fields
+    "TaxCode", "ExemptRef", "SettlementTerms", "PaymentTerms", "Discount",
+    "LastCrDate", "LastCrAmount", "Blocked", "OpenItem", "OverRideTax",
+    "MonthOrDay", "CountryCode", "CurrencyCode", "CreditLimit", "InterestAfter",
+    "PriceRegime",
+    # Currency Balance fields - This Year
+    "CurrBalanceThis01", "CurrBalanceThis02", "CurrBalanceThis03", "CurrBalanceThis04",
+    "CurrBalanceThis05", "CurrBalanceThis06", "CurrBalanceThis07", "CurrBalanceThis08",
+    "CurrBalanceThis09", "CurrBalanceThis10", "CurrBalanceThis11", "CurrBalanceThis12",
+    "CurrBalanceThis13",
+    # Currency Balance fields - Last Year
+    "CurrBalanceLast01", "CurrBalanceLast02", "CurrBalanceLast03", "CurrBalanceLast04",
+    "CurrBalanceLast05", "CurrBalanceLast06", "CurrBalanceLast07", "CurrBalanceLast08",
+    "CurrBalanceLast09", "CurrBalanceLast10", "CurrBalanceLast11", "CurrBalanceLast12",
+    "CurrBalanceLast13",
+    # User defined fields
+    "UserDefined01", "UserDefined02", "UserDefined03", "UserDefined04", "UserDefined05",
+    # Ageing fields
+    "Ageing01", "Ageing02", "Ageing03", "Ageing04", "Ageing05",
+    # Other fields
+    "InterestPer", "Freight01", "Ship", "UpdatedOn", "CashAccount", "CreateDate",
+    "CustName", "CustSurname", "CustID",
+    # Bank details
+    "BankName", "BankType", "BankBranch", "BankAccNumber", "BankAccRelation",
+    # Additional IDs
+    "GUID", "ThirdPartyID", "PassportNumber"
+]
+
+DELIVERY_ADDRESS_FIELDS = [
+    "CustomerCode", "CustDelivCode", "SalesmanCode",
+    "Contact", "Telephone", "Cell", "Fax",
+    "DelAddress01", "DelAddress02", "DelAddress03", "DelAddress04", "DelAddress05",
+    "Email", "ContactDocs", "EmailDocs", "ContactStatement", "EmailStatement"
+]
+
+HISTORY_LINE_FIELDS = [
+    "UserId", "DocumentType", "DocumentNumber", "ItemCode",
+    "CustomerCode", "SalesmanCode", "SearchType", "PPeriod",
+    "DDate", "UnitUsed", "TaxType", "DiscountType",
+    "DiscountPercentage", "Description", "CostPrice", "Qty",
+    "UnitPrice", "InclusivePrice", "FCurrUnitPrice", "FCurrInclPrice",
+    "TaxAmt", "FCurrTaxAmount", "DiscountAmount", "FCDiscountAmount",
+    "CostCode", "DateTime", "Physical", "Fixed", "ShowQty",
+    "LinkNum", "LinkedNum", "GRNQty", "LinkID", "MultiStore",
+    "IsTMBLine", "LinkDocumentType", "LinkDocumentNumber",
+    "Exported", "ExportRef", "ExportNum", "QtyLeft",
+    "CaseLotCode", "CaseLotQty", "CaseLotRatio", "CostSyncDone"
+]
+
+INVENTORY_FIELDS = [
+    "Category", "ItemCode", "Description", "Barcode",
+    "DiscountType", "Blocked", "Fixed", "ShowQty",
+    "Physical", "UnitSize", "SalesTaxType", "PurchTaxType",
+    "GLCode", "AllowTax", "LinkWeb", "SalesCommision",
+    "SerialItem", "Picture", "UserDefText01", "UserDefText02",
+    "UserDefText03", "UserDefNum01", "UserDefNum02", "UserDefNum03",
+    "CommodityCode", "NettMass", "UpdatedOn", "GUID"
+]
+
+INVENTORY_CATEGORY_FIELDS = ["ICCode", "ICDesc"]
+
+INVENTORY_GROUP_FIELDS = [
+    "InvGroup", "Description", "SalesAcc", "PurchAcc",
+    "COSAcc", "Adjustment", "StockCtl", "Variance",
+    "PurchVariance", "SalesTaxType", "PurchTaxType"
+]
+
+INVOICE_FIELDS = [
+    "DocumentType", "DocumentNumber", "CustomerCode", "DocumentDate",
+    "OrderNumber", "SalesmanCode", "UserID", "ExclIncl",
+    "Message01", "Message02", "Message03",
+    "DelAddress01", "DelAddress02", "DelAddress03", "DelAddress04", "DelAddress05",
+    "Terms", "ExtraCosts", "CostCode", "PPeriod", "ClosingDate",
+    "Telephone", "Fax", "Contact",
+    "CurrencyCode", "ExchangeRate", "DiscountPercent",
+    "Total", "FCurrTotal", "TotalTax", "FCurrTotalTax", "TotalCost",
+    "InvDeleted", "InvPrintStatus", "Onhold", "GRNMisc", "Paid",
+    "Freight01", "Ship", "IsTMBDoc", "Spare",
+    "Exported", "ExportRef", "ExportNum", "Emailed"
+]
+
+LEDGER_TRANSACTION_FIELDS = [
+    "AutoNumber", "GDC", "AccNumber", "DiscFlag", "CurrCode", 
+    "Spare", "PPeriod", "DDate", "EType", "Refrence", 
+    "JobCode", "Amount", "TaxAmt", "ThisCurrTaxAmount", 
+    "BankTaxAmount", "CurrAmt", "BankCurrAmount", "ReconFlag", 
+    "Description", "TaxType", "Country", "Generated", 
+    "PayBased", "UserID", "WhichUserRef", "LinkAcc", 
+    "UpdateReconFlag", "ChequeFlag", "LinkID", "InInv", 
+    "TaxReportDate", "TaxReportPeriod", "BatchID", 
+    "TransactionID", "Exported", "ExportRef", "ExportNum", 
+    "CostSyncDone"
+]
+
+# Integer columns Pastel sometimes returns as NUL or blank text
+LEDGER_INTEGER_FIELDS = [
+    'CurrCode', 'PPeriod', 'EType', 'ReconFlag', 'TaxType',
+    'UserID', 'UpdateReconFlag', 'ChequeFlag', 'LinkID',
+    'InInv', 'TaxReportPeriod', 'BatchID', 'TransactionID',
+    'Exported', 'ExportNum'
+]
+
+CUSTOMERS = Table(
+    "customers", "CustomerMaster", CustomerMaster, CUSTOMER_FIELDS,
+    keys=[("CustomerCode", str)],
+    filters=[
+        Filter("customer_code", "CustomerCode"),
+        Filter("category", "Category", parse=int)
+    ],
+    # Customer text is returned untrimmed
+    converters={
+        "LastCrDate": date_value,
+        "UpdatedOn": datetime_value,
+        "CreateDate": date_value
+    },
+    updated="UpdatedOn"
+)
+
+DELIVERY_ADDRESSES = Table(
+    "delivery-addresses", "DeliveryAddresses", DeliveryAddress, DELIVERY_ADDRESS_FIELDS,
+    keys=[("CustomerCode", str), ("CustDelivCode", str)],
+    filters=[
+        Filter("customer_code", "CustomerCode"),
+        Filter("cust_deliv_code", "CustDelivCode")
+    ],
+    default=strip_value
+)
+
+HISTORY_LINES = Table(
+    "history-lines", "HistoryLines", HistoryLine, HISTORY_LINE_FIELDS,
+    keys=[("DocumentType", int), ("DocumentNumber", str), ("LinkNum", int)],
+    filters=[
+        Filter("from_date", "DDate", ">=", parse=date.fromisoformat),
+        Filter("to_date", "DDate", "<=", parse=date.fromisoformat),
+        Filter("document_type", "DocumentType", parse=int),
+        Filter("document_number", "DocumentNumber"),
+        Filter("customer_code", "CustomerCode"),
+        Filter("item_code", "ItemCode")
+    ],
+    converters={
+        "DDate": date_value,
+        "DateTime": iso_datetime_value
+    },
+    default=strip_value,
+    codes=["ItemCode", "CustomerCode", "SalesmanCode", "UnitUsed", "CostCode", "MultiStore"]
+)
+
+INVENTORY = Table(
+    "inventory", "Inventory", Inventory, INVENTORY_FIELDS,
+    keys=[("ItemCode", str)],
+    filters=[
+        Filter("item_code", "ItemCode"),
+        Filter("category", "Category"),
+        Filter("blocked", "Blocked", parse=int),
+        Filter("physical", "Physical", parse=int)
+    ],
+    converters={"UpdatedOn": datetime_value},
+    default=strip_value,
+    updated="UpdatedOn"
+)
+
+INVENTORY_CATEGORIES = Table(
+    "inventory-categories", "InventoryCategory", InventoryCategory, INVENTORY_CATEGORY_FIELDS,
+    keys=[("ICCode", str)],
+    filters=[Filter("ic_code", "ICCode")],
+    default=strip_value
+)
+
+INVENTORY_GROUPS = Table(
+    "inventory-groups", "InventoryGroups", InventoryGroup, INVENTORY_GROUP_FIELDS,
+    keys=[("InvGroup", str)],
+    filters=[Filter("inv_group", "InvGroup")],
+    default=strip_value
+)
+
+INVOICES = Table(
+    "invoices", "HistoryHeader", Invoice, INVOICE_FIELDS,
+    keys=[("DocumentType", int), ("DocumentNumber", str)],
+    filters=[
+        Filter("from_date", "DocumentDate", ">=", parse=date.fromisoformat),
+        Filter("to_date", "DocumentDate", "<=", parse=date.fromisoformat),
+        Filter("customer_code", "CustomerCode"),
+        Filter("document_type", "DocumentType", parse=int),
+        Filter("document_number", "DocumentNumber")
+    ],
+    converters={
+        "DocumentDate": date_value,
+        "ClosingDate": date_value
+    },
+    default=strip_value,
+    codes=["CustomerCode", "SalesmanCode", "CostCode"]
+)
+
+LEDGER_TRANSACTIONS = Table(
+    "ledger-transactions", "LedgerTransactions", LedgerTransaction, LEDGER_TRANSACTION_FIELDS,
+    keys=[("AutoNumber", int)],
+    filters=[
+        Filter("gdc", "GDC"),
+        Filter("acc_number", "AccNumber"),
+        Filter("p_period", "PPeriod", parse=int),
+        Filter("from_date", "DDate", ">=", parse=date.fromisoformat),
+        Filter("to_date", "DDate", "<=", parse=date.fromisoformat),
+        Filter("e_type", "EType", parse=int),
+        Filter("refrence", "Refrence"),
+        Filter("min_amount", "Amount", ">=", parse=float),
+        Filter("max_amount", "Amount", "<=", parse=float),
+        # Partial match for description
+        Filter("description", "Description", "LIKE", lambda value: f"%{value}%"),
+        Filter("link_id", "LinkID", parse=int),
+        Filter("user_id", "UserID", parse=int),
+        Filter("transaction_id", "TransactionID", parse=int),
+        Filter("link_acc", "LinkAcc")
+    ],
+    converters={
+        "DDate": date_value,
+        "TaxReportDate": date_value,
+        **dict.fromkeys(LEDGER_INTEGER_FIELDS, int_or_strip_value)
+    },
+    default=strip_value,
+    codes=["GDC", "AccNumber", "DiscFlag", "JobCode", "Country", "LinkAcc"]
+)
+
+# Registry by public name, for endpoints that work across tables
+TABLES = {table.name: table for table in [
+    CUSTOMERS, DELIVERY_ADDRESSES, HISTORY_LINES, INVENTORY,
+    INVENTORY_CATEGORIES, INVENTORY_GROUPS, INVOICES, LEDGER_TRANSACTIONS
+]}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Check the AIMD concurrency limit: additive increase under use, multiplicative decrease when slow
+
+    python test_adaptive_limiter.py   (or under pytest)
+"""
+from database import AdaptiveLimiter
+from test_circuit_breaker import fake_clock, overridden
+
+LIMITER_SETTINGS = dict(
+    adaptive_concurrency_enabled=True,
+    adaptive_latency_target_ms=500,
+    adaptive_latency_smoothing=1.0,
+    adaptive_decrease_factor=0.5,
+)
+
+def busy(limiter, count):
+    for _ in range(count):
+        assert limiter.acquire(1.0)
+
+def test_additive_increase_only_while_the_limit_is_used():
+    with overridden(**LIMITER_SETTINGS), fake_clock():
+        limiter = AdaptiveLimiter(8)
+        limiter.limit = 2.0
+
+        # One query in flight out of two - fast, but the limit isn't the bottleneck
+        busy(limiter, 1)
+        limiter.release(0.01)
+        assert limiter.limit == 2.0
+
+        # Grows by 1/limit per fast query at the limit: one whole slot per limit-worth
+        limits = []
+        for _ in range(3):
+            busy(limiter, int(limiter.limit))
+            limiter.release(0.01)
+            limits.append(round(limiter.limit, 3))
+            for _ in range(limiter.in_flight):
+                limiter.release()
+        assert limits == [2.5, 2.9, 3.245]
+        assert limiter.increases == 3
+
+def test_increase_stops_at_max():
+    with overridden(**LIMITER_SETTINGS), fake_clock():
+        limiter = AdaptiveLimiter(2)
+        busy(limiter, 2)
+        limiter.release(0.01)
+        assert limiter.limit == 2.0
+        assert limiter.increases == 0
+
+def test_multiplicative_decrease_once_per_interval():
+    with overridden(**LIMITER_SETTINGS), fake_clock() as clock:
+        limiter = AdaptiveLimiter(8)
+        busy(limiter, 3)
+        limiter.release(0.8)
+        assert limiter.limit == 4.0
+
+        # A burst of slow queries inside one target interval is one cut
+        limiter.release(0.8)
+        assert limiter.limit == 4.0
+
+        clock.advance(0.5)
+        limiter.release(0.8)
+        assert limiter.limit == 2.0
+        assert limiter.decreases == 2
+
+def test_failures_cut_and_the_limit_floors_at_one():
+    with overridden(**LIMITER_SETTINGS), fake_clock() as clock:
+        limiter = AdaptiveLimiter(4)
+        for _ in range(4):
+            busy(limiter, 1)
+            # Fast, but failed
+            limiter.release(0.01, ok=False)
+            clock.advance(1)
+        assert limiter.limit == 1
+        assert limiter.decreases == 4
+
+def test_disabled_keeps_the_limit():
+    with overridden(**dict(LIMITER_SETTINGS, adaptive_concurrency_enabled=False)), fake_clock():
+        limiter = AdaptiveLimiter(4)
+        busy(limiter, 1)
+        limiter.release(5.0, ok=False)
+        assert limiter.limit == 4.0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Check priority admission: high before medium before low, and low shed at its timeout
+
+    python test_admission.py   (or under pytest)
+"""
+import time
+from threading import Thread
+
+from database import AdaptiveLimiter, Priority, admission_timeout
+from test_circuit_breaker import fake_clock, overridden
+
+ADMISSION_SETTINGS = dict(
+    adaptive_concurrency_enabled=False,
+    connection_acquire_timeout=0.1,
+    admission_timeout_medium=0.5,
+    admission_timeout_high=1.0,
+)
+
+def wait_until(condition, seconds=5):
+    end = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < end, "timed out waiting for the limiter"
+        time.sleep(0.005)
+
+def test_timeouts_by_class():
+    with overridden(**ADMISSION_SETTINGS):
+        assert admission_timeout(Priority.HIGH) == 1.0
+        assert admission_timeout(Priority.MEDIUM) == 0.5
+        assert admission_timeout(Priority.LOW) == 0.1
+
+def test_served_by_priority_then_arrival():
+    # The clock stands still, so nobody times out while the order is checked
+    with overridden(**ADMISSION_SETTINGS), fake_clock():
+        limiter = AdaptiveLimiter(1)
+        assert limiter.acquire(1.0)
+        served = []
+
+        def request(name, priority):
+            assert limiter.acquire(10.0, priority)
+            served.append(name)
+            limiter.release()
+
+        threads = []
+        for name, priority in [("low", Priority.LOW), ("medium 1", Priority.MEDIUM), ("high", Priority.HIGH), ("medium 2", Priority.MEDIUM)]:
+            thread = Thread(target=request, args=(name, priority))
+            thread.start()
+            threads.append(thread)
+            # Queued before the next one arrives
+            wait_until(lambda: limiter.waiting == len(threads))
+
+        limiter.release()
+        for thread in threads:
+            thread.join(5)
+        assert served == ["high", "medium 1", "medium 2", "low"]
+        assert limiter.in_flight == 0
+
+def test_low_priority_shed_at_its_timeout():
+    # Each clock read moves time on, so the wait loop reaches its deadline
+    with overridden(**ADMISSION_SETTINGS), fake_clock(step=0.05):
+        limiter = AdaptiveLimiter(1)
+        assert limiter.acquire(1.0, Priority.HIGH)
+
+        assert not limiter.acquire(admission_timeout(Priority.LOW), Priority.LOW)
+        assert limiter.shed[Priority.LOW] == 1
+        assert limiter.rejected == 1
+        assert limiter.waiting == 0
+
+        # The shed request left the queue - it doesn't hold up the next one
+        limiter.release()
+        assert limiter.try_acquire()
+        stats = limiter.admission_stats()
+        assert stats["low"]["shed"] == 1
+        assert stats["high"]["wait"]["count"] == 1
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Check the NumPy summary engine against plain Python totals
+
+    python test_aggregates.py   (or under pytest)
+"""
+from collections import defaultdict
+
+from aggregates import SUMMARIES, ColumnBatch
+from bench_row_mapping import synthetic_rows
+from tables import LEDGER_TRANSACTIONS
+
+LEDGER = SUMMARIES[LEDGER_TRANSACTIONS.name]
+
+def selected_rows(summary, by, count=2000):
+    """Raw rows as SELECT of just the summary's columns returns them"""
+    columns, _ = summary.layout(by)
+    positions = [summary.table.columns.index(column) for column in columns]
+    return [tuple(row[index] for index in positions) for row in synthetic_rows(summary.table, count, 6)]
+
+def batches_of(rows, size):
+    return [rows[start:start + size] for start in range(0, len(rows), size)]
+
+def python_totals(rows, group_width, measure_count):
+    totals = defaultdict(lambda: [0] + [0.0] * measure_count)
+    for row in rows:
+        key = tuple(value.strip() if isinstance(value, str) else value for value in row[:group_width])
+        entry = totals[key]
+        entry[0] += 1
+        for index, value in enumerate(row[group_width:group_width + measure_count], 1):
+            entry[index] += float(value or 0)
+    return totals
+
+def test_grouped_totals_match_python():
+    by = ["acc_number", "p_period"]
+    rows = selected_rows(LEDGER, by)
+    expected = python_totals(rows, len(by), len(LEDGER.measures))
+    # Small batches and a low merge threshold exercise the partial-total merging
+    totals, rows_read = LEDGER.totals(batches_of(rows, 150), by, merge_rows=100)
+    assert rows_read == len(rows)
+    records = totals.to_records()
+    assert len(records) == len(expected)
+    for record in records:
+        entry = expected[(record["acc_number"], record["p_period"])]
+        assert record["count"] == entry[0]
+        for name, value in zip(LEDGER.measure_names(), entry[1:]):
+            assert abs(record[name] - value) < 1e-6, (record, entry)
+    # Sorted by the group values
+    keys = [(record["acc_number"], record["p_period"]) for record in records]
+    assert keys == sorted(keys)
+
+def test_grand_total_and_no_rows():
+    rows = selected_rows(LEDGER, [])
+    totals, _ = LEDGER.totals(batches_of(rows, 500), [])
+    [record] = totals.to_records()
+    assert record["count"] == len(rows)
+    assert abs(record["amount"] - sum(float(row[0] or 0) for row in rows)) < 1e-6
+
+    [empty] = LEDGER.totals([], [])[0].to_records()
+    assert empty == {"count": 0, "amount": 0.0, "tax_amt": 0.0, "curr_amt": 0.0}
+    assert LEDGER.totals([], ["gdc"])[0].to_records() == []
+
+def test_pastel_text_cells():
+    batch = ColumnBatch.from_rows(
+        [("A  ", "\x00", "1.5"), (None, " 3", None), ("A", "", "\x00")],
+        [("gdc", "code"), ("p_period", "int"), ("amount", "number")]
+    )
+    assert batch["gdc"].tolist() == ["A", "", "A"]
+    assert batch["p_period"].tolist() == [0, 3, 0]
+    assert batch["amount"].tolist() == [1.5, 0.0, 0.0]
+    totals = batch.group_sum(["gdc"], ["amount"])
+    assert totals.to_records() == [{"gdc": "", "count": 1, "amount": 0.0}, {"gdc": "A", "count": 2, "amount": 1.5}]
+
+def test_filter_and_bad_group():
+    totals = ColumnBatch.from_rows([("A", 1.0), ("B", 0.0)], [("gdc", "code"), ("amount", "number")]).group_sum(["gdc"], ["amount"])
+    assert totals.filter(totals["amount"] != 0).to_records() == [{"gdc": "A", "count": 1, "amount": 1.0}]
+    try:
+        LEDGER.parse_group_by("acc_number,description")
+    except ValueError as e:
+        assert "description" in str(e)
+    else:
+        raise AssertionError("ungroupable column accepted")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
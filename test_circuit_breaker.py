@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Check the circuit breaker's closed / open / half-open transitions on a fake clock
+
+    python test_circuit_breaker.py   (or under pytest)
+"""
+import time
+from contextlib import contextmanager
+
+import database
+from config import settings
+from database import CircuitBreaker, CircuitOpenError
+
+class FakeClock:
+    """Stands in for the time module inside database; time() only moves when told to
+
+    step advances the clock on every read, for code that loops until a
+    deadline. Anything else (sleep, perf_counter) is the real time module.
+    """
+
+    def __init__(self, now=1_000_000.0, step=0.0):
+        self.now = now
+        self.step = step
+
+    def time(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+@contextmanager
+def fake_clock(**kwargs):
+    clock = FakeClock(**kwargs)
+    saved = database.time
+    database.time = clock
+    try:
+        yield clock
+    finally:
+        database.time = saved
+
+@contextmanager
+def overridden(**values):
+    """Settings pinned for one test, whatever the environment says"""
+    saved = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+BREAKER_SETTINGS = dict(
+    circuit_breaker_enabled=True,
+    circuit_breaker_failure_threshold=100,
+    circuit_breaker_recovery_timeout=30,
+    circuit_breaker_window_seconds=60,
+    circuit_breaker_min_samples=10,
+    circuit_breaker_error_rate=0.5,
+    circuit_breaker_latency_p95_ms=2000,
+    circuit_breaker_half_open_max_probes=1,
+    circuit_breaker_half_open_successes=3,
+)
+
+def test_trips_on_p95_latency():
+    with overridden(**BREAKER_SETTINGS), fake_clock():
+        breaker = CircuitBreaker()
+        for _ in range(19):
+            breaker.record(0.05, True)
+        # One slow query in 20 is outside the 95th percentile
+        breaker.record(2.5, True)
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record(2.5, True)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert "p95 latency" in breaker.transitions[-1]["reason"]
+
+def test_trips_on_error_rate_once_enough_samples():
+    with overridden(**BREAKER_SETTINGS), fake_clock():
+        breaker = CircuitBreaker()
+        for index in range(9):
+            breaker.record(0.05, index % 2 == 0)
+        # Five of nine failed, but nine samples are too few to judge
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.record(0.05, False)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert "error rate" in breaker.transitions[-1]["reason"]
+
+def test_old_samples_leave_the_window():
+    with overridden(**BREAKER_SETTINGS), fake_clock() as clock:
+        breaker = CircuitBreaker()
+        for _ in range(9):
+            breaker.record(0.05, False)
+        clock.advance(61)
+        breaker.record(0.05, False)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.snapshot()["window_samples"] == 1
+
+def open_breaker():
+    breaker = CircuitBreaker()
+    for _ in range(10):
+        breaker.record(0.05, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+def test_half_open_allows_a_single_probe():
+    with overridden(**BREAKER_SETTINGS), fake_clock() as clock:
+        breaker = open_breaker()
+        clock.advance(29)
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("open breaker admitted a query before the recovery timeout")
+
+        clock.advance(1)
+        assert breaker.before_request() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("second probe admitted while the first is in flight")
+
+        # A probe that never reached Pastel gives its slot back
+        breaker.cancel_probe(True)
+        assert breaker.before_request() is True
+
+def test_closes_after_required_successes():
+    with overridden(**BREAKER_SETTINGS), fake_clock() as clock:
+        breaker = open_breaker()
+        clock.advance(30)
+        for _ in range(3):
+            assert breaker.before_request() is True
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            # Queries admitted before the breaker opened don't count as probes
+            breaker.record(0.05, True, is_probe=False)
+            breaker.record(0.05, True, is_probe=True)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.before_request() is False
+
+def test_failed_or_slow_probe_reopens():
+    with overridden(**BREAKER_SETTINGS), fake_clock() as clock:
+        breaker = open_breaker()
+        clock.advance(30)
+        breaker.before_request()
+        breaker.record(0.05, False, is_probe=True)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.advance(30)
+        breaker.before_request()
+        breaker.record(2.5, True, is_probe=True)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert "probe query took" in breaker.transitions[-1]["reason"]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
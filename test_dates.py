@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Check the memoized date parsers against the strptime/fromisoformat converters they replace
+
+    python test_dates.py   (or under pytest)
+"""
+from datetime import date, datetime
+
+from dates import MemoParser, date_value, datetime_value, iso_datetime_value, parse_date
+
+def strptime_date(value):
+    if value and isinstance(value, str):
+        try:
+            if '/' in value:
+                return datetime.strptime(value, '%d/%m/%Y').date()
+            return datetime.fromisoformat(value).date()
+        except ValueError:
+            return None
+    return value
+
+def strptime_datetime(value):
+    if value and isinstance(value, str):
+        try:
+            if '/' in value:
+                return datetime.strptime(value, '%d/%m/%Y %H:%M:%S')
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+CASES = [
+    "14/05/2025", "1/5/2025", "31/02/2025", "00/00/0000", "14/05/20a5", "+1/05/2025", "1_/05/2025",
+    "2025-05-14", "2025-5-14", "14-05-2025", "2025-05-14 12:26:28", "2025-05-14T12:26:28.5",
+    "14/05/2025 12:26:28", "1/5/2025 1:2:3", "14/05/2025 25:00:00", "14/05/2025 ",
+    "", " ", "junk", None, date(2025, 5, 14), datetime(2025, 5, 14, 12, 26, 28)
+]
+
+def test_same_results_as_strptime():
+    for value in CASES:
+        # Twice - the second answer comes from the memo
+        for _ in range(2):
+            assert date_value(value) == strptime_date(value), value
+            assert datetime_value(value) == strptime_datetime(value), value
+
+def test_iso_datetime():
+    assert iso_datetime_value("2025-05-14 12:26:28") == datetime(2025, 5, 14, 12, 26, 28)
+    assert iso_datetime_value("14/05/2025") is None
+
+def test_failures_are_counted_per_cell():
+    parser = MemoParser("test", parse_date, 2)
+    for value in ["14/05/2025", "bad", "bad", "15/05/2025", "16/05/2025"]:
+        parser(value)
+    stats = parser.stats()
+    assert stats["failures"] == 2
+    assert stats["recent_failures"] == ["bad", "bad"]
+    assert stats["parsed"] == 4
+    # Bounded - cleared when full rather than growing
+    assert stats["cached"] <= 2
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Check that a streamed export gives its connection back when the client stops reading
+
+    python test_export_stream.py   (or under pytest)
+
+Runs db_pool.stream against a stub connection, so no DSN is needed.
+"""
+import asyncio
+import time
+
+import database
+from config import settings
+from database import concurrency_limiter, db_pool
+
+class StubConnection:
+    def cursor(self):
+        raise AssertionError("the export work never queries")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def endless_export(conn):
+    """Chunks forever - only a stalled consumer ends it"""
+    while True:
+        yield b"row\n" * 100
+
+async def abandoned_export():
+    export = await db_pool.stream(endless_export)
+    # The client goes away before the body is read, so the iterator never starts
+    assert concurrency_limiter.in_flight == 1
+    started = time.time()
+    while concurrency_limiter.in_flight and time.time() - started < 5:
+        await asyncio.sleep(0.05)
+    del export
+    return time.time() - started
+
+def test_abandoned_export_releases_its_slot():
+    saved = (database.pyodbc.connect, settings.export_stall_timeout_seconds, settings.export_queue_batches)
+    database.pyodbc.connect = lambda connection_string: StubConnection()
+    settings.export_stall_timeout_seconds = 0.2
+    settings.export_queue_batches = 1
+    try:
+        waited = asyncio.run(abandoned_export())
+    finally:
+        database.pyodbc.connect, settings.export_stall_timeout_seconds, settings.export_queue_batches = saved
+        db_pool.close_all()
+    assert concurrency_limiter.in_flight == 0
+    # Released at the stall timeout, nowhere near EXPORT_DEADLINE_SECONDS
+    assert waited < 2, waited
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
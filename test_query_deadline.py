@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Check the request deadline: the watchdog cancels a blocked query, and a page stops at its time budget
+
+    python test_query_deadline.py   (or under pytest)
+
+Runs against stub connections and cursors, so no DSN is needed.
+"""
+from threading import Event
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database
+from database import QueryTimeoutError, _query_stats, db_pool, execute_cached, fetch_page
+from main import query_timeout_handler
+from test_circuit_breaker import fake_clock, overridden
+
+class BlockingCursor:
+    """execute() hangs like a runaway Pervasive scan until the cursor is cancelled"""
+
+    def __init__(self):
+        self.cancelled = Event()
+
+    def execute(self, sql, params):
+        if not self.cancelled.wait(5):
+            raise AssertionError("the watchdog never cancelled the query")
+        raise database.pyodbc.Error("HY008", "Operation canceled")
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        pass
+
+class StubConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_blocked_query_cancelled_at_deadline_returns_504():
+    cursor = BlockingCursor()
+    saved = database.pyodbc.connect
+    database.pyodbc.connect = lambda connection_string: StubConnection(cursor)
+    discarded = db_pool.discarded_on_error
+
+    app = FastAPI()
+    app.add_exception_handler(QueryTimeoutError, query_timeout_handler)
+
+    @app.get("/slow")
+    async def slow():
+        def run_query(conn):
+            return execute_cached(conn, "test_slow", lambda: "SELECT * FROM Slow", ()).fetchall()
+        return await db_pool.run(run_query, timeout=0.3)
+
+    try:
+        response = TestClient(app).get("/slow")
+    finally:
+        database.pyodbc.connect = saved
+        db_pool.close_all()
+    assert cursor.cancelled.is_set()
+    assert response.status_code == 504
+    assert "deadline" in response.json()["detail"]
+    # The cancelled connection is closed rather than pooled
+    assert db_pool.discarded_on_error == discarded + 1
+
+class TimedCursor:
+    """Hands out fetchmany batches, each taking seconds on the fake clock"""
+
+    def __init__(self, clock, rows, seconds):
+        self.clock = clock
+        self.rows = rows
+        self.seconds = seconds
+
+    def fetchmany(self, size):
+        self.clock.advance(self.seconds)
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+def page(clock, rows, limit, seconds=0.6):
+    _query_stats.started_at = clock.time()
+    try:
+        return fetch_page(TimedCursor(clock, rows, seconds), limit, tuple)
+    finally:
+        _query_stats.started_at = None
+
+ROWS = [(index,) for index in range(100)]
+
+def test_page_cut_short_when_budget_spent():
+    with overridden(page_time_budget_seconds=1.0, fetch_batch_size=10), fake_clock() as clock:
+        # The second batch ends past the budget - keep what was mapped, more to come
+        items, has_more, truncated = page(clock, ROWS, 50)
+        assert len(items) == 20
+        assert items[-1] == (19,)
+        assert has_more and truncated
+
+def test_first_batch_kept_even_when_budget_spent():
+    with overridden(page_time_budget_seconds=1.0, fetch_batch_size=10), fake_clock() as clock:
+        items, has_more, truncated = page(clock, ROWS, 50, seconds=5)
+        assert len(items) == 10
+        assert has_more and truncated
+
+def test_fast_and_unbudgeted_pages_are_whole():
+    with overridden(page_time_budget_seconds=1.0, fetch_batch_size=10), fake_clock() as clock:
+        assert page(clock, ROWS, 50, seconds=0.01)[1:] == (True, False)
+        assert page(clock, ROWS[:30], 50, seconds=0.01)[1:] == (False, False)
+    with overridden(page_time_budget_seconds=0, fetch_batch_size=10), fake_clock() as clock:
+        items, has_more, truncated = page(clock, ROWS, 50, seconds=5)
+        assert len(items) == 50
+        assert has_more and not truncated
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Check the JSON response classes against FastAPI's own encoding
+
+Each page is served twice from a throwaway app - once returned as the model so
+FastAPI validates and encodes it against response_model, once wrapped in the
+response class. CompatibleResponse must match byte-for-byte; FastResponse must
+decode to the same JSON. Runs without a database.
+
+    python test_response_fast_path.py   (or under pytest)
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from bench_row_mapping import build_rows
+from models import Invoice, InvoiceResponse, PaginationMetadata
+from responses import CompatibleResponse, FastResponse, CompactPageResponse
+import responses
+from tables import TABLES, INVOICES, CUSTOMERS, InvalidFieldsError
+
+def response_model_for(table):
+    import models
+    return getattr(models, f"{table.model.__name__}Response")
+
+def compare(response_model, items, response_class=CompatibleResponse):
+    """Serve the page both ways and return the two bodies"""
+    metadata = PaginationMetadata(
+        next_cursor="eyJEb2N1bWVudE51bWJlciI6ICJJTlYwMDEifQ==",
+        has_more=True,
+        page_size=len(items),
+        cursor="eyJEb2N1bWVudE51bWJlciI6ICJJTlYwMDAifQ==",
+        timestamp=datetime(2025, 5, 14, 12, 26, 28, 123456)
+    )
+    page = response_model(data=items, metadata=metadata)
+
+    app = FastAPI()
+
+    @app.get("/default", response_model=response_model)
+    def default():
+        return page
+
+    @app.get("/fast", response_model=response_model)
+    def fast():
+        return response_class(page)
+
+    client = TestClient(app)
+    expected = client.get("/default")
+    actual = client.get("/fast")
+    assert actual.status_code == expected.status_code == 200
+    assert actual.headers["content-type"] == expected.headers["content-type"]
+    return expected.content, actual.content
+
+def test_every_table_matches():
+    for name, table in TABLES.items():
+        mapper = table.mapper
+        items = [mapper(row) for row in build_rows(table.model, mapper, 25)]
+        expected, actual = compare(response_model_for(table), items)
+        assert actual == expected, f"{name}: fast path output differs"
+
+def test_empty_page_matches():
+    expected, actual = compare(InvoiceResponse, [])
+    assert actual == expected
+
+def invoice(**values):
+    row = INVOICES.mapper(build_rows(Invoice, INVOICES.mapper, 1)[0])
+    return row.model_copy(update=values)
+
+def test_text_edge_cases_match():
+    items = [
+        invoice(customer_code='ÄFR002 "quoted" \\ back/slash'),
+        invoice(customer_code="tab\tnew\nline\rnul\x00bell\x07"),
+        invoice(customer_code="emoji \U0001F600 cjk 中文 rtl א"),
+        invoice(customer_code="   separators"),
+        invoice(customer_code="", total=None),
+    ]
+    expected, actual = compare(InvoiceResponse, items)
+    assert actual == expected
+
+def test_float_edge_cases_match():
+    values = [0.0, -0.0, 0.1, 1e-4, 9.999e-5, 1e-05, 123456789.123, 1e15, 1e16, 1.5e300, -2.5e-7]
+    for value in values:
+        expected, actual = compare(InvoiceResponse, [invoice(total=value)])
+        assert actual == expected, f"total={value!r}: fast path output differs"
+
+def test_nan_still_fails_like_fastapi():
+    for value in (float("nan"), float("inf")):
+        page = InvoiceResponse(
+            data=[invoice(total=value)],
+            metadata=PaginationMetadata(has_more=False, page_size=1, timestamp=datetime(2025, 5, 14))
+        )
+        try:
+            CompatibleResponse(page)
+        except ValueError:
+            continue
+        raise AssertionError(f"total={value!r} rendered instead of raising")
+
+def test_fast_response_decodes_the_same():
+    for name, table in TABLES.items():
+        mapper = table.mapper
+        items = [mapper(row) for row in build_rows(table.model, mapper, 25)]
+        expected, actual = compare(response_model_for(table), items, FastResponse)
+        assert json.loads(actual) == json.loads(expected), f"{name}: fast output decodes differently"
+    
+    values = [0.0, 0.1, 1e-05, 123456789.123, 1e16, 1.5e300, -2.5e-7]
+    expected, actual = compare(InvoiceResponse, [invoice(total=value) for value in values], FastResponse)
+    assert json.loads(actual) == json.loads(expected)
+
+def test_fast_response_special_values():
+    page = InvoiceResponse(
+        data=[invoice(total=float("nan"), total_tax=float("inf"))],
+        metadata=PaginationMetadata(has_more=False, page_size=1, timestamp=datetime(2025, 5, 14))
+    )
+    row = json.loads(FastResponse(page).body)["data"][0]
+    assert row["total"] is None and row["total_tax"] is None
+    
+    body = FastResponse({
+        "amount": Decimal("1234.50"),
+        "date": date(2025, 5, 14),
+        "updated": datetime(2025, 5, 14, 12, 26, 28, 5),
+        "rate": float("nan"),
+    }).body
+    assert json.loads(body) == {
+        "amount": "1234.50",
+        "date": "2025-05-14",
+        "updated": "2025-05-14T12:26:28.000005",
+        "rate": None,
+    }
+
+def test_projection_columns():
+    projection = INVOICES.projection("Total, order_number")
+    # Table order, with the keys and required fields always read
+    assert projection.columns == ["DocumentType", "DocumentNumber", "CustomerCode", "DocumentDate", "OrderNumber", "Total"]
+    assert projection.field_list == "DocumentType, DocumentNumber, CustomerCode, DocumentDate, OrderNumber, Total"
+    assert INVOICES.projection("order_number,total") is projection
+    assert CUSTOMERS.projection(None) is CUSTOMERS.projection("") is CUSTOMERS.projection(",".join(CUSTOMERS.columns))
+    try:
+        CUSTOMERS.projection("customer_desc,nope")
+    except InvalidFieldsError as e:
+        assert "nope" in str(e)
+    else:
+        raise AssertionError("unknown field accepted")
+
+def test_projected_page_renders_only_selected_fields():
+    projection = INVOICES.projection("total")
+    items = [projection.mapper(row) for row in build_rows(Invoice, projection.mapper, 3)]
+    metadata = PaginationMetadata(page_size=3, has_more=False, timestamp=datetime(2025, 5, 14))
+    page = InvoiceResponse(data=items, metadata=metadata)
+    for response_class in (CompatibleResponse, FastResponse):
+        body = json.loads(response_class(page, include=projection.page_include).body)
+        assert list(body["data"][0]) == ["document_type", "document_number", "customer_code", "document_date", "total"]
+        assert body["metadata"]["page_size"] == 3
+        detail = json.loads(response_class(items[0], include=projection.include).body)
+        assert detail == body["data"][0]
+
+def expand_compact(body, sparse=False):
+    """Rows of a compact page back as objects"""
+    columns = body["columns"]
+    objects = []
+    for row in body["rows"]:
+        if sparse:
+            presence = int.from_bytes(bytes.fromhex(row[0]), "little")
+            values = iter(row[1:])
+            row = [next(values) if presence >> index & 1 else None for index in range(len(columns))]
+        objects.append(dict(zip(columns, row)))
+    return objects
+
+def test_compact_pages_decode_to_the_same_rows():
+    metadata = PaginationMetadata(page_size=5, has_more=False, timestamp=datetime(2025, 5, 14))
+    for name, table in TABLES.items():
+        items = [table.mapper(row) for row in build_rows(table.model, table.mapper, 5)]
+        page = response_model_for(table)(data=items, metadata=metadata)
+        expected = json.loads(FastResponse(page).body)
+        for sparse in (False, True):
+            body = json.loads(CompactPageResponse(page, sparse=sparse).body)
+            assert expand_compact(body, sparse) == expected["data"], name
+            assert body["metadata"] == expected["metadata"]
+
+def test_compact_page_without_orjson():
+    items = [invoice(total=1.5, closing_date=date(2025, 1, 31), spare=None)]
+    page = InvoiceResponse(data=items, metadata=PaginationMetadata(page_size=1, has_more=False, timestamp=datetime(2025, 5, 14)))
+    with_orjson = json.loads(CompactPageResponse(page, sparse=True).body)
+    saved, responses.orjson = responses.orjson, None
+    try:
+        assert json.loads(CompactPageResponse(page, sparse=True).body) == with_orjson
+    finally:
+        responses.orjson = saved
+
+def test_openapi_schema_unchanged():
+    from main import app
+    paths = app.openapi()["paths"]
+    for path, model in [
+        ("/api/customers", "CustomerMasterResponse"),
+        ("/api/invoices", "InvoiceResponse"),
+        ("/api/customers/{customer_code}/invoices", "InvoiceResponse"),
+        ("/api/history-lines", "HistoryLineResponse"),
+        ("/api/ledger-transactions", "LedgerTransactionResponse"),
+    ]:
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema == {"$ref": f"#/components/schemas/{model}"}, path
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")
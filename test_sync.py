@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Check incremental sync tokens, and walk sync_page over Pastel-style UpdatedOn text
+
+    python test_sync.py   (or under pytest)
+
+Pastel stores UpdatedOn as DD/MM/YYYY HH:MM:SS text, so the walk runs
+against an in-memory sqlite table holding exactly that.
+"""
+import base64
+import re
+import sqlite3
+
+from tables import CUSTOMERS, CUSTOMER_FIELDS
+
+class StubCursor:
+    """sqlite cursor taking the bridge's SQL Server-style SELECT TOP n"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=()):
+        match = re.match(r"SELECT TOP (\d+) ", sql)
+        if match:
+            sql = "SELECT " + sql[match.end():] + f" LIMIT {match.group(1)}"
+        self._cursor.execute(sql, list(params))
+        return self
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+class StubConnection:
+    def __init__(self, rows):
+        self._db = sqlite3.connect(":memory:")
+        # CONCAT only arrived in sqlite 3.44
+        self._db.create_function("CONCAT", 2, lambda left, right: None if left is None or right is None else left + right)
+        self._db.execute("CREATE TABLE CustomerMaster (" + ", ".join(CUSTOMER_FIELDS) + ")")
+        self._db.executemany("INSERT INTO CustomerMaster (CustomerCode, UpdatedOn) VALUES (?, ?)", rows)
+
+    def cursor(self):
+        return StubCursor(self._db.cursor())
+
+# Out of order both as text and by key, with ties, a NULL and a year boundary
+ROWS = [
+    ("C%03d" % number, stamp)
+    for number, stamp in enumerate([
+        "28/03/2025 12:54:33", "01/04/2025 08:00:00", "28/03/2025 12:54:33", None,
+        "31/12/2024 23:59:59", "02/01/2025 00:00:01", "28/03/2025 12:54:33", "15/05/2024 09:30:00",
+        "01/04/2025 08:00:00", None, "28/03/2025 12:54:34", "03/03/2025 17:45:10"
+    ] * 3)
+]
+
+def walk(conn, since=None, limit=4):
+    """Page until has_more is false; (codes in order, pages, final mark)"""
+    codes = []
+    pages = 0
+    while True:
+        items, has_more, _, since = CUSTOMERS.sync_page(conn, limit, since)
+        codes += [item.customer_code for item in items]
+        pages += 1
+        assert pages < 100, "sync never finished"
+        if not has_more:
+            return codes, pages, since
+
+def sort_key(row):
+    code, stamp = row
+    if stamp is None:
+        return ("", code)
+    day, month, rest = stamp.split("/", 2)
+    return (rest[:4] + month + day + rest[4:], code)
+
+def test_full_sync_visits_every_row_once_in_time_order():
+    conn = StubConnection(ROWS)
+    codes, pages, mark = walk(conn)
+    assert codes == [code for code, _ in sorted(ROWS, key=sort_key)]
+    assert pages == 9
+    assert base64.b64decode(mark).decode() == "20250401 08:00:00"
+
+    # Parsed as timestamps, not left as None
+    items, _, _, _ = CUSTOMERS.sync_page(conn, 1, "2025-04-01")
+    assert items[0].updated_on.isoformat() == "2025-04-01T08:00:00"
+
+def test_next_run_sends_only_changed_rows():
+    conn = StubConnection(ROWS)
+    _, _, mark = walk(conn)
+    # Rows at the mark come again; nothing else has changed yet
+    codes, _, same_mark = walk(conn, mark)
+    assert sorted(codes) == sorted(code for code, stamp in ROWS if stamp == "01/04/2025 08:00:00")
+    assert same_mark == mark
+
+    conn._db.execute("UPDATE CustomerMaster SET UpdatedOn = '02/04/2025 10:00:00' WHERE CustomerCode IN ('C003', 'C004')")
+    codes, _, mark = walk(conn, mark)
+    assert codes[-2:] == ["C003", "C004"]
+    assert base64.b64decode(mark).decode() == "20250402 10:00:00"
+
+def test_iso_since():
+    conn = StubConnection(ROWS)
+    codes, _, _ = walk(conn, "2025-03-28T12:54:34")
+    assert sorted(codes) == sorted(code for code, stamp in ROWS if sort_key((code, stamp))[0] >= "20250328 12:54:34")
+
+def test_conditions():
+    key = CUSTOMERS.sync_key
+    assert CUSTOMERS.sync_condition("2025-05-14") == (f"{key} >= ?", ["20250514 00:00:00"])
+    assert CUSTOMERS.sync_condition(CUSTOMERS.encode_sync_token("20250514 12:26:28")) == (f"{key} >= ?", ["20250514 12:26:28"])
+    position = CUSTOMERS.encode_sync_token("20250514 12:26:28", ["C0002"])
+    assert CUSTOMERS.sync_condition(position) == (
+        f"({key} > ? OR ({key} = ? AND CustomerCode > ?))",
+        ["20250514 12:26:28", "20250514 12:26:28", "C0002"]
+    )
+
+def test_malformed_since():
+    for since in ["garbage", "14/05/2025", "!!!"]:
+        try:
+            CUSTOMERS.sync_condition(since)
+        except ValueError as e:
+            assert "since must be" in str(e)
+        else:
+            raise AssertionError(f"accepted since={since!r}")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"ok  {name}")